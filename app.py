@@ -1,5 +1,8 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for
 import os
+import queue
+import re
+import sqlite3
 import subprocess
 import json
 import requests
@@ -8,10 +11,26 @@ import git
 from git import Repo
 import docker
 import logging
-from datetime import datetime
+import shutil
+import stat
+import tarfile
+import tempfile
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import base64
+import fcntl
+import glob
+import hashlib
+import math
+import time
 from flask_cors import CORS
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
@@ -40,78 +59,708 @@ CREDENTIALS_FILE = os.path.join(DATA_DIR, 'credentials.json')
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Deploy job queue configuration
+DEPLOY_WORKERS = int(os.environ.get('DEPLOY_WORKERS', '4'))
+DEPLOY_QUEUE_LIMIT = int(os.environ.get('DEPLOY_QUEUE_LIMIT', '100'))
+DEPLOY_JOB_HISTORY = int(os.environ.get('DEPLOY_JOB_HISTORY', '200'))
+DEPLOY_EVENT_BUFFER = int(os.environ.get('DEPLOY_EVENT_BUFFER', '1000'))
+DEPLOY_PARALLEL_STEPS = os.environ.get('DEPLOY_PARALLEL_STEPS', 'false').lower() == 'true'
+
+# Report a deploy step as a no-op when nothing changed since the last
+# successful deploy of the same version (override per request with "force")
+DEPLOY_SKIP_UNCHANGED = os.environ.get('DEPLOY_SKIP_UNCHANGED', 'true').lower() == 'true'
+
+# Default limits of a /deploy/batch: deploys of the batch running at once,
+# and how many of them may push to git or use Docker at the same time
+DEPLOY_BATCH_PARALLEL = int(os.environ.get('DEPLOY_BATCH_PARALLEL', '4'))
+DEPLOY_BATCH_GIT = int(os.environ.get('DEPLOY_BATCH_GIT', '4'))
+DEPLOY_BATCH_DOCKER = int(os.environ.get('DEPLOY_BATCH_DOCKER', '2'))
+
+# Days finished deploys stay in the deploy history (0: forever)
+DEPLOY_HISTORY_DAYS = int(os.environ.get('DEPLOY_HISTORY_DAYS', '0'))
+
+DEPLOY_TIMING_WINDOW = int(os.environ.get('DEPLOY_TIMING_WINDOW', '50'))
+DEPLOY_TIMING_REGRESSION_FACTOR = float(os.environ.get('DEPLOY_TIMING_REGRESSION_FACTOR', '1.5'))
+DEPLOY_TIMING_REGRESSION_MIN = float(os.environ.get('DEPLOY_TIMING_REGRESSION_MIN', '1'))
+
+# Git staging configuration
+GIT_FAST_STAGING = os.environ.get('GIT_FAST_STAGING', 'false').lower() == 'true'
+GIT_FSMONITOR = os.environ.get('GIT_FSMONITOR')
+
+# Project index configuration (seconds)
+PROJECT_INDEX_TTL = float(os.environ.get('PROJECT_INDEX_TTL', '5'))
+PROJECT_INDEX_REFRESH = float(os.environ.get('PROJECT_INDEX_REFRESH', '60'))
+
+# Project details configuration
+PROJECT_DETAILS_WORKERS = int(os.environ.get('PROJECT_DETAILS_WORKERS', '8'))
+PROJECT_DETAILS_TTL = float(os.environ.get('PROJECT_DETAILS_TTL', '300'))
+
+# Docker client configuration
+DOCKERHUB_REGISTRY = 'https://index.docker.io/v1/'
+DOCKER_POOL_SIZE = int(os.environ.get('DOCKER_POOL_SIZE', '10'))
+DOCKER_HEALTH_INTERVAL = int(os.environ.get('DOCKER_HEALTH_INTERVAL', '30'))
+DOCKER_INVENTORY_RESYNC = float(os.environ.get('DOCKER_INVENTORY_RESYNC', '600'))
+DOCKER_CLEANUP_WORKERS = int(os.environ.get('DOCKER_CLEANUP_WORKERS', '8'))
+
+# Build engine: 'classic' (daemon builder through the API) or 'buildx'
+# (BuildKit through the docker CLI). DOCKER_BUILD_CACHE applies to buildx:
+# 'registry' (a :buildcache tag next to the image), 'local' (a directory
+# under DOCKER_BUILD_CACHE_DIR), 'inline' (cache metadata in the image) or ''.
+DOCKER_BUILD_ENGINE = os.environ.get('DOCKER_BUILD_ENGINE', 'classic')
+DOCKER_BUILD_CACHE = os.environ.get('DOCKER_BUILD_CACHE', 'inline')
+DOCKER_BUILD_CACHE_DIR = os.environ.get('DOCKER_BUILD_CACHE_DIR', os.path.join(DATA_DIR, 'build-cache'))
+DOCKER_BUILDX_BUILDER = os.environ.get('DOCKER_BUILDX_BUILDER', 'hub-helper')
+DOCKER_BUILDX_CONFIG = os.path.join(DATA_DIR, 'docker')
+
+# Build context: patterns excluded from every context before .dockerignore
+# (which can re-include with "!"), and whether a build whose context, base
+# images and engine are unchanged reuses the previous image
+DOCKER_CONTEXT_EXCLUDES = [pattern.strip() for pattern in os.environ.get(
+    'DOCKER_CONTEXT_EXCLUDES',
+    '.git,.hg,.svn,node_modules,**/__pycache__,**/*.pyc,.venv,venv,.tox,.mypy_cache,.pytest_cache,**/.DS_Store'
+).split(',') if pattern.strip()]
+DOCKER_SKIP_UNCHANGED_BUILDS = os.environ.get('DOCKER_SKIP_UNCHANGED_BUILDS', 'true').lower() == 'true'
+
+# Repositories every image is pushed to, each with the latest and version tags
+# unless the ref carries its own tag. {image} is the Docker Hub image
+# (user/repo) and {repo} the repository name, e.g.
+# "{image},localhost:5000/{repo}". Targets are pushed concurrently.
+DOCKER_PUSH_TARGETS = [ref.strip() for ref in os.environ.get('DOCKER_PUSH_TARGETS', '{image}').split(',')
+                       if ref.strip()]
+DOCKER_PUSH_WORKERS = int(os.environ.get('DOCKER_PUSH_WORKERS', '4'))
+
+# Platforms to build for, e.g. "linux/amd64,linux/arm64" (empty: the host's).
+# More than the host's needs the buildx CLI, and QEMU for foreign platforms.
+DOCKER_PLATFORMS = [platform.strip() for platform in os.environ.get('DOCKER_PLATFORMS', '').split(',')
+                    if platform.strip()]
+
+# Base images are pulled at most once per this many seconds (0: on every build)
+BASE_IMAGE_PULL_TTL = float(os.environ.get('BASE_IMAGE_PULL_TTL', '3600'))
+
+# Labels on every image Hub Helper builds, so cleanup and status can select
+# its own artifacts with daemon-side filters
+DOCKER_MANAGED_LABEL = 'hub-helper.managed'
+DOCKER_DEPLOY_LABEL = 'hub-helper.deploy-id'
+DOCKER_PROJECT_LABEL = 'hub-helper.project'
+DOCKER_BUILT_AT_LABEL = 'hub-helper.built-at'
+DOCKER_MANAGED_FILTER = f'{DOCKER_MANAGED_LABEL}=true'
+
+# Credential validation cache configuration (seconds)
+CREDENTIAL_CACHE_TTL = int(os.environ.get('CREDENTIAL_CACHE_TTL', '300'))
+CREDENTIAL_CACHE_NEGATIVE_TTL = int(os.environ.get('CREDENTIAL_CACHE_NEGATIVE_TTL', '60'))
+CREDENTIAL_CACHE_STALE = int(os.environ.get('CREDENTIAL_CACHE_STALE', '600'))
+
 # Analytics configuration
-ANALYTICS_API = 'https://hub-backend.satrawi.com'
+ANALYTICS_API = os.environ.get('ANALYTICS_API', 'https://hub-backend.satrawi.com')
 LOCAL_ANALYTICS_FILE = os.path.join(DATA_DIR, 'local_analytics.json')
+LOCAL_ANALYTICS_DB = os.path.join(DATA_DIR, 'analytics.db')
+ANALYTICS_OUTBOX_FILE = os.path.join(DATA_DIR, 'analytics_outbox.jsonl')
+ANALYTICS_OUTBOX_OFFSET_FILE = os.path.join(DATA_DIR, 'analytics_outbox.offset')
+ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', '50'))
+ANALYTICS_RETRY_MAX = float(os.environ.get('ANALYTICS_RETRY_MAX', '300'))
+ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', '10'))
+ANALYTICS_CACHE_STALE = float(os.environ.get('ANALYTICS_CACHE_STALE', '60'))
+ANALYTICS_BREAKER_THRESHOLD = int(os.environ.get('ANALYTICS_BREAKER_THRESHOLD', '3'))
+ANALYTICS_BREAKER_COOLDOWN = float(os.environ.get('ANALYTICS_BREAKER_COOLDOWN', '30'))
+
+# Prometheus metrics served at /metrics. When PROMETHEUS_MULTIPROC_DIR is set
+# (gunicorn.conf.py does this) every worker process writes its samples to
+# files in that directory and /metrics merges them, so a scrape covers the
+# whole server no matter which worker answers it.
+SLOW_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+HTTP_REQUEST_DURATION = Histogram('hub_helper_http_request_duration_seconds', 'HTTP request latency',
+                                  ['method', 'route', 'status'])
+DEPLOYS = Counter('hub_helper_deploys', 'Finished deploy jobs', ['status'])
+DEPLOY_PHASE_DURATION = Histogram('hub_helper_deploy_phase_duration_seconds', 'Duration of deploy steps and their phases',
+                                  ['step', 'phase'], buckets=SLOW_BUCKETS)
+DEPLOY_JOBS = Gauge('hub_helper_deploy_jobs', 'Queued and running deploy jobs', ['status'],
+                    multiprocess_mode='livemostrecent')
+DOCKER_BYTES = Counter('hub_helper_docker_bytes', 'Bytes of built images and of pushed layers', ['operation'])
+OUTBOUND_REQUEST_DURATION = Histogram('hub_helper_outbound_request_duration_seconds',
+                                      'Latency of calls to GitHub and the analytics API', ['target', 'outcome'])
+CACHE_LOOKUPS = Counter('hub_helper_cache_lookups', 'Cache lookups by result', ['cache', 'result'])
+ANALYTICS_OUTBOX_PENDING = Gauge('hub_helper_analytics_outbox_pending', 'Analytics events waiting for delivery',
+                                 multiprocess_mode='livemostrecent')
 
-def track_deployment_analytics(push_type):
-    """Track deployment to external analytics API"""
+@contextmanager
+def observe_outbound(target):
+    """Record the latency of an outbound HTTP call made inside the with-block.
+    
+    Yields a dict; set its 'status' to the response status code. Calls that
+    raise before a status is set are recorded with outcome 'error'.
+    """
+    call = {'status': None}
+    started = time.perf_counter()
     try:
-        response = requests.post(
-            f'{ANALYTICS_API}/click',
-            json={
-                'project_name': 'hub-helper',
-                'push_type': push_type
-            },
-            timeout=5  # 5 second timeout
-        )
-        if response.status_code == 200:
-            logger.info(f"Successfully tracked {push_type} deployment to external API")
-        else:
-            logger.warning(f"Failed to track {push_type} deployment: HTTP {response.status_code}")
+        yield call
+    finally:
+        outcome = f"{call['status'] // 100}xx" if call['status'] else 'error'
+        OUTBOUND_REQUEST_DURATION.labels(target, outcome).observe(time.perf_counter() - started)
+
+def track_deployment_analytics(push_type, project_name=None):
+    """Track deployment to external analytics API.
+    
+    The event is appended to the local outbox and delivered by the
+    background dispatcher, so this never waits on the network.
+    """
+    try:
+        append_analytics_event({
+            'id': uuid.uuid4().hex,
+            'project_name': 'hub-helper',
+            'push_type': push_type,
+            'created_at': datetime.now().isoformat()
+        })
     except Exception as e:
-        logger.warning(f"Failed to track {push_type} deployment to external API: {e}")
+        logger.warning(f"Failed to queue {push_type} deployment for external API: {e}")
     
     # Always update local analytics as backup
-    update_local_analytics(push_type)
+    update_local_analytics(push_type, project_name)
 
-def update_local_analytics(push_type):
-    """Update local analytics counter"""
+# Analytics outbox. Events are appended to ANALYTICS_OUTBOX_FILE and the
+# byte offset of the first undelivered event is kept in
+# ANALYTICS_OUTBOX_OFFSET_FILE, so queued events survive restarts. Delivery
+# is at-least-once; the file is truncated once everything has been sent.
+# Any server process may append (under an flock on the outbox), but only the
+# process holding the flock on ANALYTICS_OUTBOX_LOCK_FILE dispatches. Events
+# are sent one POST each, since the analytics API has no batch endpoint.
+ANALYTICS_OUTBOX_LOCK_FILE = ANALYTICS_OUTBOX_FILE + '.lock'
+analytics_outbox_lock = threading.Lock()
+analytics_outbox_wakeup = threading.Event()
+analytics_outbox_state = {'offset': 0, 'delivered': 0, 'dropped': 0, 'failures': 0, 'retry_delay': 0.0,
+                          'last_error': None, 'started': False, 'leader': False}
+
+def append_analytics_event(event):
+    """Durably append an event to the outbox and wake the dispatcher"""
+    with open(ANALYTICS_OUTBOX_FILE, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(json.dumps(event) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    
+    start_analytics_dispatcher()
+    analytics_outbox_wakeup.set()
+
+def load_analytics_outbox_offset():
+    """Read the saved delivery offset, resetting it if the outbox was truncated after it was saved"""
+    offset = 0
     try:
-        # Load existing counters
-        if os.path.exists(LOCAL_ANALYTICS_FILE):
-            with open(LOCAL_ANALYTICS_FILE, 'r') as f:
-                analytics = json.load(f)
-        else:
-            analytics = {'github_count': 0, 'dockerhub_count': 0}
+        with open(ANALYTICS_OUTBOX_OFFSET_FILE, 'r') as f:
+            offset = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        pass
+    
+    try:
+        if offset > os.path.getsize(ANALYTICS_OUTBOX_FILE):
+            offset = 0
+    except FileNotFoundError:
+        offset = 0
+    return offset
+
+def save_analytics_outbox_offset(offset):
+    """Atomically persist the delivery offset"""
+    temp_file = ANALYTICS_OUTBOX_OFFSET_FILE + '.tmp'
+    with open(temp_file, 'w') as f:
+        f.write(str(offset))
+    os.replace(temp_file, ANALYTICS_OUTBOX_OFFSET_FILE)
+
+def analytics_outbox_has_pending():
+    """Whether the outbox holds events past the delivery offset"""
+    try:
+        return os.path.getsize(ANALYTICS_OUTBOX_FILE) > analytics_outbox_state['offset']
+    except FileNotFoundError:
+        return False
+
+def read_analytics_batch():
+    """Read up to ANALYTICS_BATCH_SIZE undelivered events as (event, end_offset) pairs"""
+    batch = []
+    try:
+        with open(ANALYTICS_OUTBOX_FILE, 'r') as f:
+            f.seek(analytics_outbox_state['offset'])
+            while len(batch) < ANALYTICS_BATCH_SIZE:
+                line = f.readline()
+                if not line.endswith('\n'):
+                    break
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    event = None
+                batch.append((event, f.tell()))
+    except FileNotFoundError:
+        pass
+    return batch
+
+def commit_analytics_batch(offset, delivered, dropped):
+    """Advance the outbox past sent events, truncating it once fully drained"""
+    with analytics_outbox_lock:
+        analytics_outbox_state['offset'] = offset
+        analytics_outbox_state['delivered'] += delivered
+        analytics_outbox_state['dropped'] += dropped
+    
+    with open(ANALYTICS_OUTBOX_FILE, 'r+') as f:
+        # Hold the outbox flock so no process appends between the check and the truncate
+        fcntl.flock(f, fcntl.LOCK_EX)
+        if os.fstat(f.fileno()).st_size == offset:
+            # Truncate before resetting the offset; a crash in between leaves an
+            # offset past the end of file, which load_analytics_outbox_offset resets
+            f.truncate(0)
+            offset = analytics_outbox_state['offset'] = 0
+    
+    save_analytics_outbox_offset(offset)
+
+def dispatch_analytics_batch(http):
+    """Deliver up to ANALYTICS_BATCH_SIZE queued events over a keep-alive session.
+    
+    The analytics API only accepts single events (/click), so each event is
+    still its own POST; the batch only bounds how many are sent, and
+    committed to the outbox offset, per dispatcher pass.
+    
+    Returns False if delivery should be retried later, None if there was no
+    complete event to send.
+    """
+    batch = read_analytics_batch()
+    if not batch:
+        return None
+    
+    offset = analytics_outbox_state['offset']
+    delivered = dropped = 0
+    error = None
+    for event, end_offset in batch:
+        if event is None:
+            dropped += 1
+            offset = end_offset
+            continue
+        try:
+            with observe_outbound('analytics') as call:
+                response = http.post(
+                    f'{ANALYTICS_API}/click',
+                    json={'project_name': event['project_name'], 'push_type': event['push_type']},
+                    timeout=5
+                )
+                call['status'] = response.status_code
+        except Exception as e:
+            error = str(e)
+            break
         
-        # Update counter
-        if push_type == 'github':
-            analytics['github_count'] = analytics.get('github_count', 0) + 1
-        elif push_type == 'dockerhub':
-            analytics['dockerhub_count'] = analytics.get('dockerhub_count', 0) + 1
+        if response.status_code == 200:
+            delivered += 1
+        elif response.status_code >= 500 or response.status_code == 429:
+            error = f'HTTP {response.status_code}'
+            break
+        else:
+            # The backend rejected the event itself; retrying won't help
+            logger.warning(f"Analytics API rejected {event['push_type']} event: HTTP {response.status_code}")
+            dropped += 1
+        offset = end_offset
+    
+    if delivered or dropped:
+        commit_analytics_batch(offset, delivered, dropped)
+        logger.info(f"Delivered {delivered} analytics events to external API")
+    
+    if error:
+        analytics_outbox_state['last_error'] = error
+        analytics_outbox_state['failures'] += 1
+        logger.warning(f"Failed to deliver analytics events to external API: {error}")
+        return False
+    return True
+
+def run_analytics_dispatcher():
+    """Background loop delivering outbox events with exponential backoff on failure"""
+    # Become the single dispatching process; the flock is released if this process exits
+    leader_lock = open(ANALYTICS_OUTBOX_LOCK_FILE, 'a')
+    while True:
+        try:
+            fcntl.flock(leader_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(30)
+    
+    analytics_outbox_state['offset'] = load_analytics_outbox_offset()
+    analytics_outbox_state['leader'] = True
+    
+    http = requests.Session()
+    while True:
+        # Appends from other processes can't wake this thread, so poll as well
+        analytics_outbox_wakeup.wait(timeout=5)
+        analytics_outbox_wakeup.clear()
         
-        # Save updated counters
-        with open(LOCAL_ANALYTICS_FILE, 'w') as f:
-            json.dump(analytics, f)
+        while analytics_outbox_has_pending():
+            try:
+                ok = dispatch_analytics_batch(http)
+            except Exception as e:
+                logger.error(f"Analytics dispatcher error: {e}")
+                ok = False
+            
+            if ok is None:
+                break
+            if ok:
+                analytics_outbox_state['retry_delay'] = 0.0
+                continue
+            
+            delay = min(max(analytics_outbox_state['retry_delay'] * 2, 1.0), ANALYTICS_RETRY_MAX)
+            analytics_outbox_state['retry_delay'] = delay
+            time.sleep(delay)
+
+def start_analytics_dispatcher():
+    """Start the background dispatcher once per process"""
+    with analytics_outbox_lock:
+        if analytics_outbox_state['started']:
+            return
+        analytics_outbox_state['started'] = True
+    
+    threading.Thread(target=run_analytics_dispatcher, name='analytics-dispatcher', daemon=True).start()
+    analytics_outbox_wakeup.set()
+
+def get_analytics_outbox_status():
+    """Delivery counters for the analytics outbox"""
+    with analytics_outbox_lock:
+        status = {key: value for key, value in analytics_outbox_state.items() if key != 'started'}
+    
+    offset = analytics_outbox_state['offset'] if status['leader'] else load_analytics_outbox_offset()
+    try:
+        with open(ANALYTICS_OUTBOX_FILE, 'r') as f:
+            f.seek(offset)
+            status['pending'] = sum(1 for line in f if line.endswith('\n'))
+    except FileNotFoundError:
+        status['pending'] = 0
+    return status
+
+def connect_sqlite(path):
+    """Open a SQLite database in WAL mode with explicit transaction control"""
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+# Local analytics store. Counters live in SQLite (WAL mode) so concurrent
+# deploys, and multiple server processes, increment them atomically.
+# analytics_totals holds one row per push type for O(1) reads;
+# analytics_daily holds the per-project, per-day breakdown.
+analytics_db_local = threading.local()
+analytics_db_init_lock = threading.Lock()
+analytics_db_state = {'initialized': False}
+
+def get_analytics_db():
+    """Per-thread connection to the local analytics database"""
+    connection = getattr(analytics_db_local, 'connection', None)
+    if connection is None:
+        connection = analytics_db_local.connection = connect_sqlite(LOCAL_ANALYTICS_DB)
+    
+    with analytics_db_init_lock:
+        if not analytics_db_state['initialized']:
+            init_analytics_db(connection)
+            analytics_db_state['initialized'] = True
+    return connection
+
+def init_analytics_db(connection):
+    """Create the analytics tables and import counters from the old JSON file"""
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS analytics_totals (
+            push_type TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS analytics_daily (
+            push_type TEXT NOT NULL,
+            project TEXT NOT NULL,
+            day TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (push_type, project, day)
+        );
+        CREATE INDEX IF NOT EXISTS analytics_daily_day ON analytics_daily (day);
+        CREATE TABLE IF NOT EXISTS analytics_migrations (
+            name TEXT PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS analytics_upstream (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            status_code INTEGER,
+            data TEXT,
+            error TEXT,
+            fetched_at REAL NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            open_until REAL NOT NULL DEFAULT 0
+        );
+    """)
+    
+    if os.path.exists(LOCAL_ANALYTICS_FILE):
+        try:
+            # Every worker process runs this on its own; the marker row is
+            # written in the same transaction as the counters, so only the
+            # first one to take the write lock imports them
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                imported = connection.execute('SELECT 1 FROM analytics_migrations WHERE name = ?',
+                                              ('local_analytics.json',)).fetchone()
+                if not imported:
+                    with open(LOCAL_ANALYTICS_FILE, 'r') as f:
+                        legacy = json.load(f)
+                    for push_type in ('github', 'dockerhub'):
+                        connection.execute(
+                            'INSERT INTO analytics_totals (push_type, count) VALUES (?, ?) '
+                            'ON CONFLICT (push_type) DO UPDATE SET count = count + excluded.count',
+                            (push_type, int(legacy.get(f'{push_type}_count', 0)))
+                        )
+                    connection.execute('INSERT INTO analytics_migrations (name) VALUES (?)', ('local_analytics.json',))
+            try:
+                os.replace(LOCAL_ANALYTICS_FILE, LOCAL_ANALYTICS_FILE + '.migrated')
+            except FileNotFoundError:
+                pass  # Another worker already moved it
+            if not imported:
+                logger.info("Imported local analytics counters from JSON file")
+        except FileNotFoundError:
+            pass  # Another worker imported and moved it
+        except Exception as e:
+            logger.error(f"Failed to import local analytics JSON file: {e}")
+
+def update_local_analytics(push_type, project_name=None):
+    """Update local analytics counter"""
+    try:
+        connection = get_analytics_db()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT INTO analytics_totals (push_type, count) VALUES (?, 1) '
+                'ON CONFLICT (push_type) DO UPDATE SET count = count + 1',
+                (push_type,)
+            )
+            connection.execute(
+                'INSERT INTO analytics_daily (push_type, project, day, count) VALUES (?, ?, ?, 1) '
+                'ON CONFLICT (push_type, project, day) DO UPDATE SET count = count + 1',
+                (push_type, project_name or '', datetime.now().strftime('%Y-%m-%d'))
+            )
+            count = connection.execute(
+                'SELECT count FROM analytics_totals WHERE push_type = ?', (push_type,)
+            ).fetchone()[0]
         
-        logger.info(f"Updated local analytics: {push_type} count is now {analytics.get(push_type + '_count', 0)}")
+        logger.info(f"Updated local analytics: {push_type} count is now {count}")
         
     except Exception as e:
         logger.error(f"Failed to update local analytics for {push_type}: {e}")
 
 def get_local_analytics():
     """Get local analytics counters"""
+    analytics = {'github_count': 0, 'dockerhub_count': 0}
     try:
-        if os.path.exists(LOCAL_ANALYTICS_FILE):
-            with open(LOCAL_ANALYTICS_FILE, 'r') as f:
-                return json.load(f)
+        for push_type, count in get_analytics_db().execute('SELECT push_type, count FROM analytics_totals'):
+            analytics[f'{push_type}_count'] = count
     except Exception as e:
         logger.error(f"Failed to load local analytics: {e}")
     
-    return {'github_count': 0, 'dockerhub_count': 0}
+    return analytics
+
+def get_local_analytics_breakdown(project_name=None, days=30):
+    """Per-project and per-day local deployment counts for the last `days` days"""
+    since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    query = 'SELECT push_type, project, day, count FROM analytics_daily WHERE day >= ?'
+    params = [since]
+    if project_name:
+        query += ' AND project = ?'
+        params.append(project_name)
+    
+    by_project = {}
+    by_day = {}
+    for push_type, project, day, count in get_analytics_db().execute(query + ' ORDER BY day', params):
+        key = f'{push_type}_count'
+        project_counts = by_project.setdefault(project or 'unknown', {'github_count': 0, 'dockerhub_count': 0})
+        project_counts[key] = project_counts.get(key, 0) + count
+        day_counts = by_day.setdefault(day, {'github_count': 0, 'dockerhub_count': 0})
+        day_counts[key] = day_counts.get(key, 0) + count
+    
+    return {'since': since, 'projects': by_project, 'days': by_day}
+
+def reset_local_analytics():
+    """Zero all local analytics counters"""
+    connection = get_analytics_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute('DELETE FROM analytics_totals')
+        connection.execute('DELETE FROM analytics_daily')
+
+# Shared cache of GET {ANALYTICS_API}/analytics/hub-helper for the counter
+# and health endpoints. Responses are fresh for ANALYTICS_CACHE_TTL seconds
+# and served stale for ANALYTICS_CACHE_STALE more while one background
+# request refreshes them. Concurrent misses wait on a single in-flight
+# request, and after ANALYTICS_BREAKER_THRESHOLD consecutive failures no
+# requests are made for ANALYTICS_BREAKER_COOLDOWN seconds. The cached
+# response and breaker state live in the analytics database and refreshes
+# run under an flock on ANALYTICS_UPSTREAM_LOCK_FILE, so outbound traffic is
+# at most one request per TTL regardless of how many clients poll or how
+# many server processes serve them.
+ANALYTICS_UPSTREAM_LOCK_FILE = os.path.join(DATA_DIR, 'analytics_upstream.lock')
+analytics_upstream_lock = threading.Lock()
+analytics_upstream_http = requests.Session()
+analytics_upstream_state = {'inflight': None}
+analytics_upstream_stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0,
+                            'fetches': 0, 'fetch_errors': 0, 'breaker_rejections': 0}
+
+def get_analytics_upstream():
+    """Cached external analytics response as {'status_code', 'data', 'error', 'age'}"""
+    leader = False
+    with analytics_upstream_lock:
+        now = time.time()
+        shared = load_analytics_upstream()
+        entry = shared['entry']
+        age = now - entry['fetched_at'] if entry else None
+        
+        if entry and age < ANALYTICS_CACHE_TTL:
+            analytics_upstream_stats['hits'] += 1
+            CACHE_LOOKUPS.labels('analytics_upstream', 'hit').inc()
+            return upstream_view(entry, now)
+        
+        if now < shared['open_until']:
+            analytics_upstream_stats['breaker_rejections'] += 1
+            CACHE_LOOKUPS.labels('analytics_upstream', 'breaker_open').inc()
+            if entry:
+                return upstream_view(entry, now)
+            return {'status_code': None, 'data': None, 'error': 'circuit open', 'age': None}
+        
+        if entry and age < ANALYTICS_CACHE_TTL + ANALYTICS_CACHE_STALE:
+            analytics_upstream_stats['stale_hits'] += 1
+            CACHE_LOOKUPS.labels('analytics_upstream', 'stale_hit').inc()
+            if not analytics_upstream_state['inflight']:
+                analytics_upstream_state['inflight'] = threading.Event()
+                threading.Thread(target=refresh_analytics_upstream, name='analytics-upstream-refresh',
+                                 daemon=True).start()
+            return upstream_view(entry, now)
+        
+        inflight = analytics_upstream_state['inflight']
+        if inflight:
+            analytics_upstream_stats['coalesced'] += 1
+            CACHE_LOOKUPS.labels('analytics_upstream', 'coalesced').inc()
+        else:
+            analytics_upstream_stats['misses'] += 1
+            CACHE_LOOKUPS.labels('analytics_upstream', 'miss').inc()
+            inflight = analytics_upstream_state['inflight'] = threading.Event()
+            leader = True
+    
+    if leader:
+        refresh_analytics_upstream()
+    else:
+        inflight.wait(timeout=10)
+    
+    entry = load_analytics_upstream()['entry']
+    if entry:
+        return upstream_view(entry, time.time())
+    return {'status_code': None, 'data': None, 'error': 'no response from external API', 'age': None}
+
+def refresh_analytics_upstream():
+    """Fetch the external analytics once and publish the result to waiting callers.
+    
+    Processes take turns under the flock; one that gets it after another
+    process has refreshed (or opened the breaker) uses that result instead.
+    """
+    try:
+        with open(ANALYTICS_UPSTREAM_LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            shared = load_analytics_upstream()
+            previous = shared['entry']
+            now = time.time()
+            if (previous and now - previous['fetched_at'] < ANALYTICS_CACHE_TTL) or now < shared['open_until']:
+                return
+            
+            entry = {'status_code': None, 'data': None, 'error': None, 'fetched_at': 0.0}
+            try:
+                with observe_outbound('analytics') as call:
+                    response = analytics_upstream_http.get(f'{ANALYTICS_API}/analytics/hub-helper', timeout=5)
+                    call['status'] = response.status_code
+                entry['status_code'] = response.status_code
+                try:
+                    entry['data'] = response.json()
+                except ValueError:
+                    pass
+                failed = response.status_code >= 500
+            except Exception as e:
+                entry['error'] = str(e)
+                failed = True
+            
+            now = entry['fetched_at'] = time.time()
+            failures, open_until = shared['failures'], shared['open_until']
+            with analytics_upstream_lock:
+                analytics_upstream_stats['fetches'] += 1
+                if failed:
+                    analytics_upstream_stats['fetch_errors'] += 1
+            
+            if failed:
+                failures += 1
+                if failures >= ANALYTICS_BREAKER_THRESHOLD:
+                    open_until = now + ANALYTICS_BREAKER_COOLDOWN
+                    logger.warning(f"External analytics API failing, pausing requests for {ANALYTICS_BREAKER_COOLDOWN:.0f}s")
+                # Keep serving the last good response while it is within the stale window
+                if (previous and previous['error'] is None
+                        and now - previous['fetched_at'] < ANALYTICS_CACHE_TTL + ANALYTICS_CACHE_STALE):
+                    entry = previous
+            else:
+                failures, open_until = 0, 0.0
+            save_analytics_upstream(entry, failures, open_until)
+    except Exception as e:
+        logger.warning(f"Failed to refresh the external analytics cache: {e}")
+    finally:
+        with analytics_upstream_lock:
+            inflight = analytics_upstream_state['inflight']
+            analytics_upstream_state['inflight'] = None
+        if inflight:
+            inflight.set()
+
+def load_analytics_upstream():
+    """Shared cache row: the cached entry (None if there is none) and the breaker state"""
+    row = get_analytics_db().execute(
+        'SELECT status_code, data, error, fetched_at, failures, open_until FROM analytics_upstream WHERE id = 1'
+    ).fetchone()
+    if row is None:
+        return {'entry': None, 'failures': 0, 'open_until': 0.0}
+    status_code, data, error, fetched_at, failures, open_until = row
+    entry = {'status_code': status_code, 'data': json.loads(data) if data is not None else None,
+             'error': error, 'fetched_at': fetched_at}
+    return {'entry': entry, 'failures': failures, 'open_until': open_until}
+
+def save_analytics_upstream(entry, failures, open_until):
+    """Publish a refresh result and the breaker state to every process"""
+    connection = get_analytics_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute(
+            'INSERT OR REPLACE INTO analytics_upstream (id, status_code, data, error, fetched_at, failures, open_until) '
+            'VALUES (1, ?, ?, ?, ?, ?, ?)',
+            (entry['status_code'], json.dumps(entry['data']) if entry['data'] is not None else None,
+             entry['error'], entry['fetched_at'], failures, open_until)
+        )
+
+def upstream_view(entry, now):
+    """Public view of a cached upstream entry"""
+    return {
+        'status_code': entry['status_code'],
+        'data': entry['data'],
+        'error': entry['error'],
+        'age': round(now - entry['fetched_at'], 3)
+    }
+
+def get_analytics_upstream_stats():
+    """Hit/miss and circuit breaker counters for the external analytics cache"""
+    with analytics_upstream_lock:
+        stats = dict(analytics_upstream_stats)
+    shared = load_analytics_upstream()
+    stats['circuit_open'] = time.time() < shared['open_until']
+    stats['consecutive_failures'] = shared['failures']
+    return stats
 
 def get_encryption_key():
     """Get or create encryption key for storing credentials"""
     key_file = os.path.join(DATA_DIR, 'key.key')
-    if os.path.exists(key_file):
+    if not os.path.exists(key_file):
+        # O_EXCL so concurrent server processes can't each create a different key
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(Fernet.generate_key())
+        except FileExistsError:
+            pass
+    
+    with open(key_file, 'rb') as f:
+        key = f.read()
+    if not key:
+        # Another process created the file but hasn't written the key yet
+        time.sleep(0.1)
         with open(key_file, 'rb') as f:
-            return f.read()
-    else:
-        key = Fernet.generate_key()
-        with open(key_file, 'wb') as f:
-            f.write(key)
-        return key
+            key = f.read()
+    return key
 
 def encrypt_data(data):
     """Encrypt sensitive data"""
@@ -157,17 +806,84 @@ def load_credentials():
             logger.error(f"Error loading credentials: {e}")
     return {}
 
+# Shared Docker client. One pooled client is used process-wide; it is
+# health-checked with a ping at most every DOCKER_HEALTH_INTERVAL seconds and
+# rebuilt when the daemon stops answering (e.g. after a daemon restart).
+docker_client = None
+docker_client_checked_at = 0
+docker_logins = {}
+docker_client_lock = threading.Lock()
+
+def get_docker_client():
+    """Get the shared Docker client, reconnecting if the daemon went away"""
+    global docker_client, docker_client_checked_at
+    with docker_client_lock:
+        now = time.monotonic()
+        if docker_client is not None:
+            if now - docker_client_checked_at < DOCKER_HEALTH_INTERVAL:
+                return docker_client
+            try:
+                docker_client.ping()
+                docker_client_checked_at = now
+                return docker_client
+            except Exception as e:
+                logger.warning(f"Docker daemon health check failed, reconnecting: {e}")
+                discard_docker_client()
+        
+        # from_env honours DOCKER_HOST, so this can point at any daemon or a fake API socket
+        docker_client = docker.from_env(max_pool_size=DOCKER_POOL_SIZE)
+        docker_client_checked_at = now
+        logger.info("Connected shared Docker client")
+        return docker_client
+
+def discard_docker_client():
+    """Drop the shared client and its logins (caller holds docker_client_lock).
+    
+    The old client is not closed: deploy threads may still be streaming build
+    or push output through it. It is closed by garbage collection once the
+    last of them lets go of it.
+    """
+    global docker_client
+    docker_client = None
+    docker_logins.clear()
+
+def reset_docker_client_if_disconnected(error):
+    """Force a reconnect on the next call if an error came from a lost daemon connection"""
+    if isinstance(error, requests.exceptions.ConnectionError):
+        with docker_client_lock:
+            discard_docker_client()
+
+def docker_login(client, username, password, registry=DOCKERHUB_REGISTRY, force=False):
+    """Log in to a registry once per registry, user and password"""
+    key = (registry, username)
+    password_hash = hashlib.sha256(password.encode()).hexdigest()
+    
+    with docker_client_lock:
+        if not force and docker_logins.get(key) == password_hash:
+            CACHE_LOOKUPS.labels('docker_login', 'hit').inc()
+            return
+    
+    CACHE_LOOKUPS.labels('docker_login', 'miss').inc()
+    
+    client.login(username=username, password=password, registry=registry, reauth=force)
+    
+    with docker_client_lock:
+        # Only remember the login if the client wasn't replaced meanwhile
+        if client is docker_client:
+            docker_logins[key] = password_hash
+
 def validate_dockerhub_credentials(dockerhub_creds):
     """Validate Docker Hub credentials by attempting to login"""
     try:
-        client = docker.from_env()
-        client.login(
-            username=dockerhub_creds['username'],
-            password=dockerhub_creds['password'],
-            registry='https://index.docker.io/v1/'
+        docker_login(
+            get_docker_client(),
+            dockerhub_creds['username'],
+            dockerhub_creds['password'],
+            force=True
         )
         return True
     except Exception as e:
+        reset_docker_client_if_disconnected(e)
         logger.error(f"Docker Hub credentials validation failed: {e}")
         return False
 
@@ -175,12 +891,97 @@ def validate_github_token(github_token):
     """Validate GitHub token by making a simple API call"""
     try:
         headers = {'Authorization': f'token {github_token}'}
-        response = requests.get('https://api.github.com/user', headers=headers)
+        with observe_outbound('github') as call:
+            response = requests.get('https://api.github.com/user', headers=headers, timeout=10)
+            call['status'] = response.status_code
         return response.status_code == 200
     except Exception as e:
         logger.error(f"GitHub token validation failed: {e}")
         return False
 
+# Credential validation cache. Entries are keyed by a hash of the credentials
+# and served until CREDENTIAL_CACHE_TTL (or CREDENTIAL_CACHE_NEGATIVE_TTL for
+# failed validations) expires; after that they are still served for up to
+# CREDENTIAL_CACHE_STALE seconds while a background refresh runs.
+validation_cache = {}
+validation_cache_stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0}
+validation_cache_lock = threading.Lock()
+validation_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='credential-refresh')
+
+def credential_cache_key(kind, credentials):
+    """Cache key for a set of credentials that never stores them in clear text"""
+    return hashlib.sha256(f"{kind}:{json.dumps(credentials, sort_keys=True)}".encode()).hexdigest()
+
+def cached_validation(kind, credentials, validator):
+    """Validate credentials through the TTL cache"""
+    key = credential_cache_key(kind, credentials)
+    now = time.monotonic()
+    
+    with validation_cache_lock:
+        entry = validation_cache.get(key)
+        if entry:
+            age = now - entry['checked_at']
+            ttl = CREDENTIAL_CACHE_TTL if entry['valid'] else CREDENTIAL_CACHE_NEGATIVE_TTL
+            if age < ttl:
+                validation_cache_stats['hits'] += 1
+                CACHE_LOOKUPS.labels('credential_validation', 'hit').inc()
+                return entry['valid']
+            if age < ttl + CREDENTIAL_CACHE_STALE:
+                validation_cache_stats['stale_hits'] += 1
+                CACHE_LOOKUPS.labels('credential_validation', 'stale_hit').inc()
+                if not entry['refreshing']:
+                    entry['refreshing'] = True
+                    validation_refresh_executor.submit(refresh_validation, key, credentials, validator)
+                return entry['valid']
+        validation_cache_stats['misses'] += 1
+        CACHE_LOOKUPS.labels('credential_validation', 'miss').inc()
+    
+    valid = validator(credentials)
+    store_validation(key, valid)
+    return valid
+
+def refresh_validation(key, credentials, validator):
+    """Background revalidation of a stale cache entry"""
+    try:
+        valid = validator(credentials)
+    except Exception as e:
+        logger.warning(f"Background credential revalidation failed: {e}")
+        with validation_cache_lock:
+            if key in validation_cache:
+                validation_cache[key]['refreshing'] = False
+        return
+    
+    store_validation(key, valid)
+    with validation_cache_lock:
+        validation_cache_stats['refreshes'] += 1
+
+def store_validation(key, valid):
+    """Record a validation result in the cache"""
+    with validation_cache_lock:
+        validation_cache[key] = {'valid': valid, 'checked_at': time.monotonic(), 'refreshing': False}
+
+def clear_validation_cache():
+    """Forget all cached validation results"""
+    with validation_cache_lock:
+        validation_cache.clear()
+
+def get_validation_cache_stats():
+    """Hit/miss counters for the credential validation cache"""
+    with validation_cache_lock:
+        stats = dict(validation_cache_stats)
+        stats['entries'] = len(validation_cache)
+    lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else 0.0
+    return stats
+
+def is_github_token_valid(github_token):
+    """Cached variant of validate_github_token for page loads and status checks"""
+    return cached_validation('github', github_token, validate_github_token)
+
+def are_dockerhub_credentials_valid(dockerhub_creds):
+    """Cached variant of validate_dockerhub_credentials for page loads and status checks"""
+    return cached_validation('dockerhub', dockerhub_creds, validate_dockerhub_credentials)
+
 @app.route('/')
 def index():
     """Main page - check if user is authenticated"""
@@ -193,7 +994,7 @@ def index():
         # Validate and restore GitHub token
         if 'github_token' in saved_creds:
             github_token = saved_creds['github_token']
-            if validate_github_token(github_token):
+            if is_github_token_valid(github_token):
                 session['github_token'] = github_token
                 valid_github = True
                 logger.info("GitHub session restored from persistent storage")
@@ -203,7 +1004,7 @@ def index():
         # Validate and restore Docker Hub credentials
         if 'dockerhub_credentials' in saved_creds:
             dockerhub_creds = saved_creds['dockerhub_credentials']
-            if validate_dockerhub_credentials(dockerhub_creds):
+            if are_dockerhub_credentials_valid(dockerhub_creds):
                 session['dockerhub_credentials'] = dockerhub_creds
                 valid_dockerhub = True
                 logger.info("Docker Hub session restored from persistent storage")
@@ -262,7 +1063,9 @@ def github_callback():
         'code': code
     }
     
-    response = requests.post(token_url, data=token_data, headers={'Accept': 'application/json'})
+    with observe_outbound('github') as call:
+        response = requests.post(token_url, data=token_data, headers={'Accept': 'application/json'})
+        call['status'] = response.status_code
     token_info = response.json()
     
     if 'access_token' in token_info:
@@ -286,7 +1089,11 @@ def dockerhub_auth():
     # Test Docker Hub login
     dockerhub_creds = {'username': username, 'password': password}
     
-    if validate_dockerhub_credentials(dockerhub_creds):
+    # Always check a fresh login against the registry, then seed the cache with the result
+    valid = validate_dockerhub_credentials(dockerhub_creds)
+    store_validation(credential_cache_key('dockerhub', dockerhub_creds), valid)
+    
+    if valid:
         session['dockerhub_credentials'] = dockerhub_creds
         # Save Docker Hub credentials to persistent storage
         save_credentials(dockerhub_creds=dockerhub_creds)
@@ -298,144 +1105,1501 @@ def dockerhub_auth():
 
 @app.route('/projects')
 def get_projects():
-    """Get list of project folders"""
+    """Get list of project folders.
+    
+    Supports ?q= (case-insensitive name filter), ?offset= and ?limit=; the
+    number of matching projects is returned in the X-Total-Count header.
+    ?details=true adds git, version, Dockerfile and size metadata.
+    """
     projects = get_project_folders()
-    return jsonify(projects)
+    
+    name_filter = request.args.get('q', '').strip().lower()
+    if name_filter:
+        projects = [project for project in projects if name_filter in project['name'].lower()]
+    
+    total = len(projects)
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = request.args.get('limit')
+        limit = max(0, int(limit)) if limit is not None else None
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    
+    projects = projects[offset:offset + limit if limit is not None else None]
+    
+    # Details are only collected for the requested page
+    if request.args.get('details', '').lower() in ('1', 'true', 'yes'):
+        for project, details in zip(projects, get_project_details(projects)):
+            project['details'] = details
+    
+    response = jsonify(projects)
+    response.headers['X-Total-Count'] = str(total)
+    return response
 
 @app.route('/deploy', methods=['POST'])
 def deploy():
-    """Deploy project to GitHub and Docker Hub"""
-    data = request.json
+    """Queue a deployment of a project to GitHub and Docker Hub"""
+    project_name, params, error = parse_deploy_request(request.json)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+    
+    job = create_deploy_job(project_name, params)
+    if not enqueue_deploy_job(job):
+        logger.warning(f"Deploy queue full, rejecting deployment of {project_name}")
+        return jsonify({'error': 'Deploy queue is full, try again later'}), 503
+    
+    logger.info(f"Queued deploy job {job['id']} for {project_name}")
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('get_deploy_job', job_id=job['id'])
+    }), 202
+
+def parse_deploy_request(data, defaults=None):
+    """Validate the settings of one deploy, falling back to defaults for missing keys.
+    
+    Returns (project_name, job params, error) where error is None or a
+    (message, HTTP status) pair. Credentials are captured here because
+    workers run outside the request context.
+    """
+    data = {**(defaults or {}), **data}
     project_name = data.get('project_name')
     github_repo = data.get('github_repo')
     dockerhub_repo = data.get('dockerhub_repo')
     project_version = data.get('project_version', 'v1.0.0')
     commit_message = data.get('commit_message', f'Release {project_name} {project_version}')
+    parallel = bool(data.get('parallel', DEPLOY_PARALLEL_STEPS))
+    fast_staging = bool(data.get('fast_staging', GIT_FAST_STAGING))
+    build_engine = data.get('build_engine', DOCKER_BUILD_ENGINE)
+    push_targets = data.get('push_targets')
+    platforms = data.get('platforms', DOCKER_PLATFORMS)
     
     if not project_name:
-        return jsonify({'error': 'Project name is required'}), 400
+        return project_name, None, ('Project name is required', 400)
+    
+    if build_engine not in ('classic', 'buildx'):
+        return project_name, None, ('build_engine must be "classic" or "buildx"', 400)
+    
+    if push_targets is not None and (not isinstance(push_targets, list) or not push_targets
+                                     or not all(isinstance(ref, str) and ref.strip() for ref in push_targets)):
+        return project_name, None, ('push_targets must be a non-empty list of image references', 400)
+    
+    if not isinstance(platforms, list) or not all(
+            isinstance(platform, str) and re.fullmatch(r'[a-z0-9]+/[a-z0-9]+(/[a-z0-9]+)?', platform)
+            for platform in platforms):
+        return project_name, None, ('platforms must be a list like ["linux/amd64", "linux/arm64"]', 400)
     
     if not github_repo and not dockerhub_repo:
-        return jsonify({'error': 'At least one deployment target is required'}), 400
+        return project_name, None, ('At least one deployment target is required', 400)
     
     project_path = os.path.join(PROJECTS_PATH, project_name)
     if not os.path.exists(project_path):
-        return jsonify({'error': 'Project not found'}), 404
+        return project_name, None, ('Project not found', 404)
+    
+    return project_name, {
+        'project_path': project_path,
+        'github_repo': github_repo,
+        'dockerhub_repo': dockerhub_repo,
+        'project_version': project_version,
+        'commit_message': commit_message,
+        'parallel': parallel,
+        'fast_staging': fast_staging,
+        'build_engine': build_engine,
+        'push_targets': push_targets,
+        'platforms': platforms or None,
+        'force': bool(data.get('force', False)),
+        'github_token': session.get('github_token'),
+        'dockerhub_creds': session.get('dockerhub_credentials')
+    }, None
+
+@app.route('/deploy/batch', methods=['POST'])
+def deploy_batch():
+    """Queue deployments of many projects as one batch.
+    
+    Body: {"projects": [{"project_name": ..., <any /deploy setting>}, ...],
+    "defaults": {<settings shared by every project>}, "max_parallel": n,
+    "max_git": n, "max_docker": n}. The limits cap how many of the batch's
+    deploys run at once and how many of them push to git or use Docker at
+    the same time, across all server processes. Either every project is
+    queued or none is.
+    """
+    data = request.json or {}
+    projects = data.get('projects')
+    defaults = data.get('defaults') or {}
+    if not isinstance(projects, list) or not projects or not all(isinstance(item, dict) for item in projects):
+        return jsonify({'error': 'projects must be a non-empty list of deploy settings'}), 400
+    if not isinstance(defaults, dict):
+        return jsonify({'error': 'defaults must be an object'}), 400
+    
+    limits = {}
+    for key, default in (('max_parallel', DEPLOY_BATCH_PARALLEL), ('max_git', DEPLOY_BATCH_GIT),
+                         ('max_docker', DEPLOY_BATCH_DOCKER)):
+        value = data.get(key, default)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            return jsonify({'error': f'{key} must be a positive integer'}), 400
+        limits[key] = value
+    
+    batch_id = uuid.uuid4().hex
+    jobs = []
+    for index, item in enumerate(projects):
+        project_name, params, error = parse_deploy_request(item, defaults)
+        if error:
+            return jsonify({'error': f'projects[{index}] ({project_name}): {error[0]}'}), error[1]
+        params['batch'] = {'id': batch_id, 'max_git': limits['max_git'], 'max_docker': limits['max_docker']}
+        jobs.append(create_deploy_job(project_name, params))
+    
+    if not enqueue_deploy_batch(batch_id, jobs, limits['max_parallel']):
+        logger.warning(f"Deploy queue full, rejecting batch of {len(jobs)} deployments")
+        return jsonify({'error': 'Deploy queue is full, try again later'}), 503
+    
+    logger.info(f"Queued deploy batch {batch_id} with {len(jobs)} jobs")
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'job_ids': [job['id'] for job in jobs],
+        **limits,
+        'status_url': url_for('get_deploy_batch', batch_id=batch_id),
+        'events_url': url_for('stream_deploy_batch_events', batch_id=batch_id)
+    }), 202
+
+@app.route('/deploy/batch/<batch_id>')
+def get_deploy_batch(batch_id):
+    """Combined status and report of a deploy batch"""
+    report = get_deploy_batch_report(batch_id)
+    if not report:
+        return jsonify({'error': 'Batch not found'}), 404
+    return jsonify(report)
+
+@app.route('/deploy/batch/<batch_id>/events')
+def stream_deploy_batch_events(batch_id):
+    """Stream aggregate progress of a deploy batch as Server-Sent Events.
+    
+    Step results and job outcomes of the batch are relayed as they happen
+    ('step', 'job'), followed by the updated job counts ('progress'); the
+    final event ('done') carries the combined report.
+    """
+    subscriber = subscribe_deploy_events(batch_id)
+    snapshot = get_deploy_batch_report(batch_id)
+    
+    if not snapshot:
+        unsubscribe_deploy_events(batch_id, subscriber)
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    def generate():
+        try:
+            report = snapshot
+            yield format_sse({'type': 'progress', 'status': report['status'], 'counts': report['counts']})
+            idle = 0
+            while report['status'] not in ('completed', 'failed'):
+                try:
+                    event = subscriber.get(timeout=2)
+                    idle = 0
+                    yield format_sse(event)
+                except queue.Empty:
+                    idle += 2
+                
+                # Jobs run by other server processes only show up in the job store
+                latest = get_deploy_batch_report(batch_id)
+                if not latest:
+                    break
+                if latest['counts'] != report['counts']:
+                    idle = 0
+                    yield format_sse({'type': 'progress', 'status': latest['status'], 'counts': latest['counts']})
+                report = latest
+                if idle >= 15:
+                    # Keep proxies from closing an idle connection during long builds
+                    idle = 0
+                    yield ': keepalive\n\n'
+            yield format_sse({'type': 'done', 'batch': report})
+        finally:
+            unsubscribe_deploy_events(batch_id, subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/deploy/jobs')
+def list_deploy_jobs():
+    """List recent deploy jobs, newest first"""
+    project_name = request.args.get('project')
+    status = request.args.get('status')
+    
+    jobs = list_deploy_job_records(project_name, status)
+    return jsonify({'jobs': jobs, 'queue_depth': get_deploy_queue_depth(), 'workers': DEPLOY_WORKERS})
+
+@app.route('/deploy/timings')
+def get_deploy_timings():
+    """Per-phase deploy duration statistics over recent completed deploys"""
+    project_name = request.args.get('project')
+    try:
+        limit = max(1, min(int(request.args.get('limit', DEPLOY_TIMING_WINDOW)), DEPLOY_JOB_HISTORY))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    return jsonify(get_deploy_timing_report(project_name, limit))
+
+@app.route('/deploys')
+def list_deploys():
+    """Query the deploy history, newest first.
     
+    Filters: ?project=, ?status=succeeded|failed, ?version=, ?batch=,
+    ?since= and ?until= (ISO timestamps of when deploys finished). Pages hold
+    ?limit= deploys (at most 500); pass the returned next_before as ?before=
+    for the next page.
+    """
+    filters, error = parse_deploy_history_filters()
+    if error:
+        return jsonify({'error': error}), 400
     try:
-        result = {'steps': []}
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        before = int(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        return jsonify({'error': 'limit and before must be integers'}), 400
+    
+    return jsonify(list_deploy_history(filters, limit, before))
+
+@app.route('/deploys/stats')
+def get_deploys_stats():
+    """Per-project deploy counts, success rate and p50/p95 durations (same filters as /deploys)"""
+    filters, error = parse_deploy_history_filters()
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(get_deploy_history_stats(filters))
+
+def parse_deploy_history_filters():
+    """History filters from the query string; returns (filters, error)"""
+    filters = {
+        'project_name': request.args.get('project'),
+        'status': request.args.get('status'),
+        'version': request.args.get('version'),
+        'batch_id': request.args.get('batch'),
+        'since': request.args.get('since'),
+        'until': request.args.get('until')
+    }
+    if filters['status'] and filters['status'] not in ('succeeded', 'failed'):
+        return None, 'status must be "succeeded" or "failed"'
+    for key in ('since', 'until'):
+        if filters[key]:
+            try:
+                filters[key] = datetime.fromisoformat(filters[key]).isoformat()
+            except ValueError:
+                return None, f'{key} must be an ISO 8601 timestamp'
+    return filters, None
+
+@app.route('/deploy/jobs/<job_id>')
+def get_deploy_job(job_id):
+    """Get status and result of a deploy job"""
+    job = get_deploy_job_record(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/deploy/jobs/<job_id>/events')
+def stream_deploy_job_events(job_id):
+    """Stream build and push progress for a deploy job as Server-Sent Events"""
+    subscriber = subscribe_deploy_events(job_id)
+    snapshot = get_deploy_job_record(job_id)
+    
+    if not snapshot:
+        unsubscribe_deploy_events(job_id, subscriber)
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        try:
+            status = snapshot['status']
+            yield format_sse({'type': 'status', 'status': status})
+            if status in ('completed', 'failed'):
+                yield format_sse({'type': 'done', 'job': snapshot})
+                return
+            
+            idle = 0
+            while True:
+                try:
+                    event = subscriber.get(timeout=2)
+                except queue.Empty:
+                    # Live events only reach this process if it runs the job; when
+                    # another server process does, follow the job store instead
+                    job = get_deploy_job_record(job_id)
+                    if job and job['status'] != status:
+                        status = job['status']
+                        yield format_sse({'type': 'status', 'status': status})
+                    if not job or status in ('completed', 'failed'):
+                        yield format_sse({'type': 'done', 'job': job})
+                        return
+                    idle += 2
+                    if idle >= 15:
+                        # Keep proxies from closing an idle connection during long build steps
+                        idle = 0
+                        yield ': keepalive\n\n'
+                    continue
+                idle = 0
+                yield format_sse(event)
+                if event['type'] == 'done':
+                    return
+        finally:
+            unsubscribe_deploy_events(job_id, subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Live progress subscribers per job. Events are relayed to each connected
+# client through a bounded queue and never stored on the job itself.
+deploy_event_subscribers = {}
+deploy_events_lock = threading.Lock()
+
+def subscribe_deploy_events(job_id):
+    """Register a bounded event queue for a job"""
+    subscriber = queue.Queue(maxsize=DEPLOY_EVENT_BUFFER)
+    with deploy_events_lock:
+        deploy_event_subscribers.setdefault(job_id, []).append(subscriber)
+    return subscriber
+
+def unsubscribe_deploy_events(job_id, subscriber):
+    """Remove an event queue registered with subscribe_deploy_events"""
+    with deploy_events_lock:
+        subscribers = deploy_event_subscribers.get(job_id, [])
+        if subscriber in subscribers:
+            subscribers.remove(subscriber)
+        if not subscribers:
+            deploy_event_subscribers.pop(job_id, None)
+
+def publish_deploy_event(job_id, event):
+    """Send an event to every client watching a job, dropping the oldest on overflow"""
+    with deploy_events_lock:
+        subscribers = list(deploy_event_subscribers.get(job_id, []))
+    
+    for subscriber in subscribers:
+        while True:
+            try:
+                subscriber.put_nowait(event)
+                break
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events message"""
+    return f"data: {json.dumps(event)}\n\n"
+
+# Deploy job store. Jobs live in SQLite (DEPLOY_JOBS_DB) so every server
+# process sees the same queue and history. Each process runs a dispatcher
+# that claims queued jobs into its own DEPLOY_WORKERS-sized pool. A job is
+# only claimable while no other job of the same project is running, which
+# serializes deploys per project across all processes. Job parameters,
+# including credentials, are stored encrypted and removed once the job ends.
+# Running jobs are heartbeated; a job whose process died is marked failed.
+# Jobs queued by /deploy/batch belong to a batch, whose max_parallel caps how
+# many of them are claimed at once.
+DEPLOY_JOBS_DB = os.path.join(DATA_DIR, 'jobs.db')
+DEPLOY_HEARTBEAT_INTERVAL = 5
+DEPLOY_HEARTBEAT_TIMEOUT = 30
+DEPLOY_JOB_COLUMNS = 'id, project_name, status, created_at, started_at, finished_at, result, error, batch_id'
+deploy_jobs_db_local = threading.local()
+deploy_dispatcher_lock = threading.Lock()
+deploy_dispatcher_wakeup = threading.Event()
+deploy_dispatcher_state = {'started': False, 'running': 0, 'worker_id': f'{os.getpid()}-{uuid.uuid4().hex[:8]}'}
+deploy_executor = ThreadPoolExecutor(max_workers=DEPLOY_WORKERS, thread_name_prefix='deploy-worker')
+
+def get_deploy_jobs_db():
+    """Per-thread connection to the deploy job store"""
+    connection = getattr(deploy_jobs_db_local, 'connection', None)
+    if connection is None:
+        connection = deploy_jobs_db_local.connection = connect_sqlite(DEPLOY_JOBS_DB)
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS deploy_jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                project_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                result TEXT,
+                error TEXT,
+                params TEXT,
+                worker_id TEXT,
+                heartbeat_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS deploy_jobs_status ON deploy_jobs (status, project_name);
+            CREATE TABLE IF NOT EXISTS deploy_batches (
+                id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                max_parallel INTEGER NOT NULL
+            );
+        """)
+        # Job stores created before batches existed
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(deploy_jobs)')]
+        if 'batch_id' not in columns:
+            try:
+                connection.execute('ALTER TABLE deploy_jobs ADD COLUMN batch_id TEXT')
+            except sqlite3.OperationalError:
+                pass  # added by another process meanwhile
+        connection.execute('CREATE INDEX IF NOT EXISTS deploy_jobs_batch ON deploy_jobs (batch_id, status)')
+    return connection
+
+def create_deploy_job(project_name, params):
+    """Create a new deploy job record"""
+    return {
+        'id': uuid.uuid4().hex,
+        'project_name': project_name,
+        'status': 'queued',
+        'created_at': datetime.now().isoformat(),
+        'started_at': None,
+        'finished_at': None,
+        'result': None,
+        'error': None,
+        'params': params
+    }
+
+def serialize_deploy_job(row):
+    """Public view of a deploy job row (never exposes credentials)"""
+    job_id, project_name, status, created_at, started_at, finished_at, result, error, batch_id = row
+    return {
+        'id': job_id,
+        'project_name': project_name,
+        'status': status,
+        'created_at': created_at,
+        'started_at': started_at,
+        'finished_at': finished_at,
+        'result': json.loads(result) if result else None,
+        'error': error,
+        'batch_id': batch_id
+    }
+
+def get_deploy_job_record(job_id):
+    """Public view of one deploy job, or None"""
+    row = get_deploy_jobs_db().execute(
+        f'SELECT {DEPLOY_JOB_COLUMNS} FROM deploy_jobs WHERE id = ?', (job_id,)
+    ).fetchone()
+    return serialize_deploy_job(row) if row else None
+
+def list_deploy_job_records(project_name=None, status=None):
+    """Recent deploy jobs, newest first"""
+    query = f'SELECT {DEPLOY_JOB_COLUMNS} FROM deploy_jobs WHERE 1 = 1'
+    params = []
+    if project_name:
+        query += ' AND project_name = ?'
+        params.append(project_name)
+    if status:
+        query += ' AND status = ?'
+        params.append(status)
+    query += ' ORDER BY seq DESC LIMIT ?'
+    params.append(DEPLOY_JOB_HISTORY)
+    return [serialize_deploy_job(row) for row in get_deploy_jobs_db().execute(query, params)]
+
+def get_deploy_queue_depth():
+    """Number of queued and running jobs across all processes"""
+    return get_deploy_jobs_db().execute(
+        "SELECT COUNT(*) FROM deploy_jobs WHERE status IN ('queued', 'running')"
+    ).fetchone()[0]
+
+def enqueue_deploy_job(job):
+    """Store a queued job and wake this process's dispatcher"""
+    connection = get_deploy_jobs_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        queue_depth = connection.execute(
+            "SELECT COUNT(*) FROM deploy_jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+        if queue_depth >= DEPLOY_QUEUE_LIMIT:
+            return False
         
+        connection.execute(
+            'INSERT INTO deploy_jobs (id, project_name, status, created_at, params) VALUES (?, ?, ?, ?, ?)',
+            (job['id'], job['project_name'], job['status'], job['created_at'], encrypt_data(job['params']))
+        )
+        prune_deploy_jobs(connection)
+    
+    start_deploy_dispatcher()
+    deploy_dispatcher_wakeup.set()
+    return True
+
+def enqueue_deploy_batch(batch_id, jobs, max_parallel):
+    """Store a batch and all its queued jobs, or nothing if they don't fit in the queue"""
+    connection = get_deploy_jobs_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        queue_depth = connection.execute(
+            "SELECT COUNT(*) FROM deploy_jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+        if queue_depth + len(jobs) > DEPLOY_QUEUE_LIMIT:
+            return False
+        
+        connection.execute('INSERT INTO deploy_batches (id, created_at, max_parallel) VALUES (?, ?, ?)',
+                           (batch_id, datetime.now().isoformat(), max_parallel))
+        connection.executemany(
+            'INSERT INTO deploy_jobs (id, project_name, status, created_at, params, batch_id) VALUES (?, ?, ?, ?, ?, ?)',
+            [(job['id'], job['project_name'], job['status'], job['created_at'], encrypt_data(job['params']), batch_id)
+             for job in jobs]
+        )
+        prune_deploy_jobs(connection)
+    
+    start_deploy_dispatcher()
+    deploy_dispatcher_wakeup.set()
+    return True
+
+def prune_deploy_jobs(connection):
+    """Drop the oldest finished jobs beyond DEPLOY_JOB_HISTORY (inside the caller's transaction)"""
+    connection.execute(
+        "DELETE FROM deploy_jobs WHERE status IN ('completed', 'failed') AND seq NOT IN ("
+        "SELECT seq FROM deploy_jobs WHERE status IN ('completed', 'failed') ORDER BY seq DESC LIMIT ?)",
+        (DEPLOY_JOB_HISTORY,)
+    )
+    connection.execute(
+        'DELETE FROM deploy_batches WHERE id NOT IN (SELECT batch_id FROM deploy_jobs WHERE batch_id IS NOT NULL)'
+    )
+
+def get_deploy_batch_report(batch_id):
+    """Job counts, overall status and per-job outcome of a batch, or None"""
+    connection = get_deploy_jobs_db()
+    batch = connection.execute('SELECT created_at, max_parallel FROM deploy_batches WHERE id = ?',
+                               (batch_id,)).fetchone()
+    if not batch:
+        return None
+    rows = connection.execute(
+        'SELECT id, project_name, status, started_at, finished_at, result, error FROM deploy_jobs '
+        'WHERE batch_id = ? ORDER BY seq', (batch_id,)
+    ).fetchall()
+    
+    counts = {'queued': 0, 'running': 0, 'succeeded': 0, 'failed': 0}
+    jobs = []
+    for job_id, project_name, status, started_at, finished_at, result, error in rows:
+        steps = [{'step': step['step'], 'success': step['success'], 'error': step.get('error')}
+                 for step in (json.loads(result)['steps'] if result else [])]
+        success = status == 'completed' and all(step['success'] for step in steps)
+        counts[status if status in ('queued', 'running') else 'succeeded' if success else 'failed'] += 1
+        jobs.append({
+            'id': job_id,
+            'project_name': project_name,
+            'status': status,
+            'success': success,
+            'error': error or next((step['error'] for step in steps if not step['success']), None),
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'duration': round((datetime.fromisoformat(finished_at) - datetime.fromisoformat(started_at))
+                              .total_seconds(), 4) if started_at and finished_at else None,
+            'steps': steps
+        })
+    
+    if counts['queued'] + counts['running']:
+        status = 'queued' if counts['queued'] == len(jobs) else 'running'
+    else:
+        status = 'failed' if counts['failed'] else 'completed'
+    started = [job['started_at'] for job in jobs if job['started_at']]
+    finished = [job['finished_at'] for job in jobs if job['finished_at']]
+    return {
+        'id': batch_id,
+        'created_at': batch[0],
+        'max_parallel': batch[1],
+        'status': status,
+        'total': len(jobs),
+        'counts': counts,
+        'started_at': min(started) if started else None,
+        'finished_at': max(finished) if status in ('completed', 'failed') and finished else None,
+        'duration': round((datetime.fromisoformat(max(finished)) - datetime.fromisoformat(min(started)))
+                          .total_seconds(), 4) if status in ('completed', 'failed') and started else None,
+        'jobs': jobs
+    }
+
+def claim_deploy_job():
+    """Atomically take the oldest queued job whose project has nothing running (and whose batch has room)"""
+    connection = get_deploy_jobs_db()
+    now = time.time()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute(
+            "UPDATE deploy_jobs SET status = 'failed', error = 'Server process exited before the job finished', "
+            "finished_at = ?, params = NULL WHERE status = 'running' AND heartbeat_at < ?",
+            (datetime.now().isoformat(), now - DEPLOY_HEARTBEAT_TIMEOUT)
+        )
+        row = connection.execute(
+            "SELECT id, project_name, params FROM deploy_jobs j WHERE status = 'queued' AND project_name NOT IN "
+            "(SELECT project_name FROM deploy_jobs WHERE status = 'running') AND (batch_id IS NULL OR "
+            "(SELECT COUNT(*) FROM deploy_jobs r WHERE r.batch_id = j.batch_id AND r.status = 'running') < "
+            "(SELECT max_parallel FROM deploy_batches b WHERE b.id = j.batch_id)) ORDER BY seq LIMIT 1"
+        ).fetchone()
+        if not row:
+            return None
+        
+        connection.execute(
+            "UPDATE deploy_jobs SET status = 'running', started_at = ?, worker_id = ?, heartbeat_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), deploy_dispatcher_state['worker_id'], now, row[0])
+        )
+    return {'id': row[0], 'project_name': row[1], 'params': decrypt_data(row[2])}
+
+def run_deploy_job(job):
+    """Worker entry point: run a claimed deploy job and record its outcome"""
+    publish_deploy_event(job['id'], {'type': 'status', 'status': 'running'})
+    batch = job['params'].get('batch')
+    started_at = datetime.now().isoformat()
+    
+    def progress(event):
+        publish_deploy_event(job['id'], event)
+        # Batch watchers only get step results, not every build log line
+        if batch and event['type'] == 'step':
+            publish_deploy_event(batch['id'], {**event, 'job_id': job['id'], 'project_name': job['project_name']})
+    
+    try:
+        result = run_deployment(**job['params'], deploy_id=job['id'], progress=progress)
+        status, error = 'completed', None
+    except Exception as e:
+        logger.error(f"Deploy job {job['id']} failed: {str(e)}")
+        result, status, error = None, 'failed', str(e)
+    DEPLOYS.labels(status).inc()
+    finished_at = datetime.now().isoformat()
+    
+    try:
+        connection = get_deploy_jobs_db()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'UPDATE deploy_jobs SET status = ?, result = ?, error = ?, finished_at = ?, params = NULL WHERE id = ?',
+                (status, json.dumps(result) if result is not None else None, error, finished_at, job['id'])
+            )
+            prune_deploy_jobs(connection)
+        
+        try:
+            record_deploy_history(job, started_at, finished_at, status, result, error)
+        except Exception as history_error:
+            logger.warning(f"Failed to record deploy {job['id']} in the history: {history_error}")
+    finally:
+        with deploy_dispatcher_lock:
+            deploy_dispatcher_state['running'] -= 1
+        deploy_dispatcher_wakeup.set()
+    
+    publish_deploy_event(job['id'], {'type': 'done', 'job': get_deploy_job_record(job['id'])})
+    logger.info(f"Deploy job {job['id']} for {job['project_name']} {status}")
+    if batch:
+        publish_deploy_event(batch['id'], {'type': 'job', 'job_id': job['id'], 'project_name': job['project_name'],
+                                           'status': status})
+        release_batch_slots(batch['id'])
+
+def run_deploy_dispatcher():
+    """Claim queued jobs while this process has free workers, heartbeating running ones"""
+    last_heartbeat = 0.0
+    while True:
+        # Jobs queued or finished by other processes can't wake this thread, so poll as well
+        deploy_dispatcher_wakeup.wait(timeout=1)
+        deploy_dispatcher_wakeup.clear()
+        
+        try:
+            if deploy_dispatcher_state['running'] and time.time() - last_heartbeat >= DEPLOY_HEARTBEAT_INTERVAL:
+                last_heartbeat = time.time()
+                get_deploy_jobs_db().execute(
+                    "UPDATE deploy_jobs SET heartbeat_at = ? WHERE status = 'running' AND worker_id = ?",
+                    (last_heartbeat, deploy_dispatcher_state['worker_id'])
+                )
+            
+            while deploy_dispatcher_state['running'] < DEPLOY_WORKERS:
+                job = claim_deploy_job()
+                if not job:
+                    break
+                with deploy_dispatcher_lock:
+                    deploy_dispatcher_state['running'] += 1
+                deploy_executor.submit(run_deploy_job, job)
+        except Exception as e:
+            logger.error(f"Deploy dispatcher error: {e}")
+            time.sleep(1)
+
+def start_deploy_dispatcher():
+    """Start the deploy dispatcher once per process"""
+    with deploy_dispatcher_lock:
+        if deploy_dispatcher_state['started']:
+            return
+        deploy_dispatcher_state['started'] = True
+    threading.Thread(target=run_deploy_dispatcher, name='deploy-dispatcher', daemon=True).start()
+
+def run_deployment(project_path, github_repo, dockerhub_repo, project_version, commit_message,
+                   github_token=None, dockerhub_creds=None, progress=None, parallel=False, fast_staging=False,
+                   deploy_id=None, build_engine=None, push_targets=None, platforms=None, batch=None, force=False):
+    """Run the GitHub and Docker Hub deployment steps for a project.
+    
+    In a batch, each step first waits for one of the batch's git or Docker
+    slots; the wait is reported as git_slot_wait / docker_slot_wait. In
+    parallel mode the git step only takes its slot once the build context
+    has been captured.
+    """
+    result = {'steps': []}
+    timings = {}
+    started = time.perf_counter()
+    
+    def report(step_result):
+        if progress:
+            progress({'type': 'step', 'step': step_result})
+        return step_result
+    
+    def git_step(wait_for=None):
+        if batch and wait_for:
+            # The build context is only captured once the Docker step has a
+            # slot, so wait for it before taking a git slot instead of holding
+            # one idle while other jobs' pushes queue
+            with timed_phase(timings, 'wait_for_build_context'):
+                wait_for.wait()
+        with batch_slot(batch, 'git', timings):
+            return report(push_to_github(project_path, github_repo, commit_message, project_version,
+                                         github_token=github_token, wait_for=wait_for, fast_staging=fast_staging,
+                                         force=force))
+    
+    def docker_step(context_ready=None):
+        with batch_slot(batch, 'docker', timings):
+            return report(push_to_dockerhub(project_path, dockerhub_repo, project_version,
+                                            dockerhub_creds=dockerhub_creds, progress=progress,
+                                            context_ready=context_ready, deploy_id=deploy_id,
+                                            build_engine=build_engine, push_targets=push_targets,
+                                            platforms=platforms, force=force))
+    
+    if parallel and github_repo and dockerhub_repo:
+        # The version file is the only write both steps depend on, so it goes
+        # first. Git then waits until the build context has been tarred before
+        # touching .git, and the push and the build run side by side.
+        with timed_phase(timings, 'version_file'):
+            write_version_file(project_path, project_version)
+        context_ready = threading.Event()
+        
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='deploy-step') as step_pool:
+            git_future = step_pool.submit(git_step, wait_for=context_ready)
+            docker_future = step_pool.submit(docker_step, context_ready=context_ready)
+            git_result = git_future.result()
+            docker_result = docker_future.result()
+        
+        result['steps'].extend([git_result, docker_result])
+    else:
         # Step 1: Git operations
         if github_repo:
-            git_result = push_to_github(project_path, github_repo, commit_message, project_version)
-            result['steps'].append(git_result)
+            result['steps'].append(git_step())
         
         # Step 2: Docker operations  
+        docker_result = None
         if dockerhub_repo:
-            docker_result = push_to_dockerhub(project_path, dockerhub_repo, project_version)
+            docker_result = docker_step()
             result['steps'].append(docker_result)
-            
-            # Automatic cleanup after Docker operations
-            if docker_result['success']:
+    
+    # A first deploy may have just initialised .git
+    with timed_phase(timings, 'refresh_index'):
+        refresh_project_entry(os.path.basename(project_path))
+    
+    # Automatic cleanup after Docker operations
+    if dockerhub_repo and docker_result['success'] and not docker_result.get('skipped'):
+        try:
+            with timed_phase(timings, 'cleanup'):
+                cleanup_old_containers()
+            logger.info("Automatic cleanup completed after Docker deployment")
+        except Exception as cleanup_error:
+            logger.warning(f"Automatic cleanup failed: {cleanup_error}")
+    
+    timings['total'] = round(time.perf_counter() - started, 4)
+    result['timings'] = timings
+    result['success'] = True
+    observe_deploy_timings(result)
+    logger.info(f"Deploy of {os.path.basename(project_path)} took {timings['total']}s: " + ', '.join(
+        f"{step['step']} {step.get('timings', {}).get('total', 0)}s" for step in result['steps']))
+    return result
+
+DEPLOY_SLOTS_DIR = os.path.join(DATA_DIR, 'slots')
+
+def batch_slot(batch, kind, timings):
+    """Slot limiting a batch's concurrent 'git' or 'docker' steps; no limit outside a batch"""
+    if not batch:
+        return nullcontext()
+    return deploy_slot(f"{batch['id']}-{kind}", batch[f'max_{kind}'], timings, f'{kind}_slot_wait')
+
+@contextmanager
+def deploy_slot(name, limit, timings, phase):
+    """Hold one of limit slots called name, shared by every server process.
+    
+    A slot is an flock on one of limit lock files in DEPLOY_SLOTS_DIR, so it
+    is released even if the process dies. The wait goes to timings[phase].
+    """
+    os.makedirs(DEPLOY_SLOTS_DIR, exist_ok=True)
+    slot = None
+    with timed_phase(timings, phase):
+        while slot is None:
+            for index in range(limit):
+                slot_file = open(os.path.join(DEPLOY_SLOTS_DIR, f'{name}-{index}.lock'), 'a')
                 try:
-                    cleanup_old_containers()
-                    logger.info("Automatic cleanup completed after Docker deployment")
-                except Exception as cleanup_error:
-                    logger.warning(f"Automatic cleanup failed: {cleanup_error}")
+                    fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    slot = slot_file
+                    break
+                except OSError:
+                    slot_file.close()
+            else:
+                time.sleep(0.5)
+    try:
+        yield
+    finally:
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+def release_batch_slots(batch_id):
+    """Remove a batch's slot files once none of its jobs can still take a slot"""
+    remaining = get_deploy_jobs_db().execute(
+        "SELECT COUNT(*) FROM deploy_jobs WHERE batch_id = ? AND status IN ('queued', 'running')", (batch_id,)
+    ).fetchone()[0]
+    if not remaining:
+        for path in glob.glob(os.path.join(DEPLOY_SLOTS_DIR, f'{batch_id}-*.lock')):
+            os.remove(path)
+
+@contextmanager
+def timed_phase(timings, phase):
+    """Add the duration of the with-block to timings[phase] (seconds), even if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = round(timings.get(phase, 0) + time.perf_counter() - started, 4)
+
+def observe_deploy_timings(result):
+    """Feed the phase durations of a finished deploy into the metrics"""
+    phases = [('Deploy', result['timings'])] + [(step['step'], step.get('timings', {})) for step in result['steps']]
+    for step, step_timings in phases:
+        for phase, duration in step_timings.items():
+            DEPLOY_PHASE_DURATION.labels(step, phase).observe(duration)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def get_deploy_timing_report(project_name=None, limit=DEPLOY_TIMING_WINDOW):
+    """Per-phase duration statistics over the most recent completed deploys.
+    
+    Built from the results kept in the deploy job store, so the window rolls
+    with DEPLOY_JOB_HISTORY and covers jobs run by every worker process. A
+    phase is flagged as a regression when its latest duration exceeds
+    DEPLOY_TIMING_REGRESSION_FACTOR times the median of the earlier runs
+    (and by at least DEPLOY_TIMING_REGRESSION_MIN seconds, to ignore jitter
+    in phases that take milliseconds).
+    """
+    query = "SELECT project_name, finished_at, result FROM deploy_jobs WHERE status = 'completed' AND result IS NOT NULL"
+    params = []
+    if project_name:
+        query += ' AND project_name = ?'
+        params.append(project_name)
+    query += ' ORDER BY seq DESC LIMIT ?'
+    params.append(limit)
+    rows = get_deploy_jobs_db().execute(query, params).fetchall()
+    
+    # Oldest first, so the last sample of every phase is the latest run
+    samples = {}
+    for _, _, result in reversed(rows):
+        result = json.loads(result)
+        phases = [('Deploy', result.get('timings', {}))]
+        phases += [(step['step'], step.get('timings', {})) for step in result.get('steps', [])]
+        for step, step_timings in phases:
+            for phase, duration in step_timings.items():
+                samples.setdefault(step, {}).setdefault(phase, []).append(duration)
+    
+    report = {}
+    regressions = []
+    for step, phases in samples.items():
+        report[step] = {}
+        for phase, durations in phases.items():
+            report[step][phase] = {
+                'count': len(durations),
+                'last': durations[-1],
+                'avg': round(sum(durations) / len(durations), 4),
+                'p50': percentile(durations, 0.5),
+                'p95': percentile(durations, 0.95),
+                'max': max(durations)
+            }
+            if len(durations) > 1:
+                baseline = percentile(durations[:-1], 0.5)
+                if (durations[-1] > baseline * DEPLOY_TIMING_REGRESSION_FACTOR
+                        and durations[-1] - baseline >= DEPLOY_TIMING_REGRESSION_MIN):
+                    regressions.append({'step': step, 'phase': phase, 'last': durations[-1], 'baseline_p50': baseline})
+    
+    return {
+        'deploys': len(rows),
+        'window': limit,
+        'latest': {'project_name': rows[0][0], 'finished_at': rows[0][1]} if rows else None,
+        'steps': report,
+        'regressions': regressions
+    }
+
+# Deploy history. Unlike the job store, which only keeps the most recent
+# DEPLOY_JOB_HISTORY jobs for the queue, every finished deploy is appended
+# here with one row per step, and kept for DEPLOY_HISTORY_DAYS (0: forever).
+# Listing pages by seq (keyset pagination) through the project and status
+# indexes, so queries stay fast with hundreds of thousands of deploys.
+DEPLOY_HISTORY_DB = os.path.join(DATA_DIR, 'deploy_history.db')
+DEPLOY_HISTORY_COLUMNS = ('seq', 'id', 'project_name', 'batch_id', 'version', 'status', 'started_at', 'finished_at',
+                          'duration', 'image_digest', 'error')
+deploy_history_db_local = threading.local()
+
+def get_deploy_history_db():
+    """Per-thread connection to the deploy history"""
+    connection = getattr(deploy_history_db_local, 'connection', None)
+    if connection is None:
+        connection = deploy_history_db_local.connection = connect_sqlite(DEPLOY_HISTORY_DB)
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS deploys (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                project_name TEXT NOT NULL,
+                batch_id TEXT,
+                version TEXT,
+                status TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT NOT NULL,
+                duration REAL,
+                image_digest TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS deploys_project ON deploys (project_name, seq);
+            CREATE INDEX IF NOT EXISTS deploys_status ON deploys (status, seq);
+            CREATE INDEX IF NOT EXISTS deploys_batch ON deploys (batch_id) WHERE batch_id IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS deploys_finished ON deploys (finished_at);
+            -- Covers the statistics queries, filters included
+            CREATE INDEX IF NOT EXISTS deploys_project_duration
+                ON deploys (project_name, duration, finished_at, status);
+            CREATE TABLE IF NOT EXISTS deploy_steps (
+                deploy_seq INTEGER NOT NULL,
+                step TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                skipped INTEGER NOT NULL,
+                duration REAL,
+                message TEXT,
+                error TEXT,
+                PRIMARY KEY (deploy_seq, step)
+            ) WITHOUT ROWID;
+        """)
+    return connection
+
+def record_deploy_history(job, started_at, finished_at, status, result, error):
+    """Append a finished deploy job and its step results to the history.
+    
+    status is 'succeeded' only if the job completed and every step succeeded.
+    """
+    steps = result['steps'] if result else []
+    docker_step = next((step for step in steps if step['step'] == 'Docker Push' and step.get('pushes')), None)
+    params = job['params']
+    
+    connection = get_deploy_history_db()
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        cursor = connection.execute(
+            'INSERT INTO deploys (id, project_name, batch_id, version, status, started_at, finished_at, duration, '
+            'image_digest, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job['id'], job['project_name'], (params.get('batch') or {}).get('id'), params.get('project_version'),
+             'succeeded' if status == 'completed' and all(step['success'] for step in steps) else 'failed',
+             started_at, finished_at, result['timings']['total'] if result else None,
+             docker_step['pushes'][0].get('digest') if docker_step else None,
+             error or next((step.get('error') for step in steps if not step['success']), None))
+        )
+        connection.executemany(
+            'INSERT OR REPLACE INTO deploy_steps (deploy_seq, step, success, skipped, duration, message, error) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(cursor.lastrowid, step['step'], int(step['success']), int(bool(step.get('skipped'))),
+              step.get('timings', {}).get('total'), step.get('message'), step.get('error')) for step in steps]
+        )
+        
+        if DEPLOY_HISTORY_DAYS:
+            cutoff = (datetime.now() - timedelta(days=DEPLOY_HISTORY_DAYS)).isoformat()
+            connection.execute('DELETE FROM deploy_steps WHERE deploy_seq IN '
+                               '(SELECT seq FROM deploys WHERE finished_at < ?)', (cutoff,))
+            connection.execute('DELETE FROM deploys WHERE finished_at < ?', (cutoff,))
+
+def deploy_history_filters(project_name=None, status=None, version=None, batch_id=None, since=None, until=None):
+    """WHERE clause and parameters shared by history listing and statistics"""
+    clauses = []
+    params = []
+    for clause, value in (('project_name = ?', project_name), ('status = ?', status), ('version = ?', version),
+                          ('batch_id = ?', batch_id), ('finished_at >= ?', since), ('finished_at < ?', until)):
+        if value:
+            clauses.append(clause)
+            params.append(value)
+    return ' AND '.join(clauses) or '1 = 1', params
+
+def list_deploy_history(filters, limit=50, before=None):
+    """One page of deploys, newest first, with their steps"""
+    where, params = deploy_history_filters(**filters)
+    if before:
+        where += ' AND seq < ?'
+        params.append(before)
+    connection = get_deploy_history_db()
+    rows = connection.execute(
+        f"SELECT {', '.join(DEPLOY_HISTORY_COLUMNS)} FROM deploys WHERE {where} ORDER BY seq DESC LIMIT ?",
+        params + [limit]
+    ).fetchall()
+    deploys = [dict(zip(DEPLOY_HISTORY_COLUMNS, row)) for row in rows]
+    
+    steps = {}
+    if deploys:
+        seqs = [deploy['seq'] for deploy in deploys]
+        for seq, step, success, skipped, duration, message, error in connection.execute(
+                'SELECT deploy_seq, step, success, skipped, duration, message, error FROM deploy_steps '
+                f"WHERE deploy_seq IN ({', '.join('?' * len(seqs))})", seqs):
+            steps.setdefault(seq, []).append({'step': step, 'success': bool(success), 'skipped': bool(skipped),
+                                              'duration': duration, 'message': message, 'error': error})
+    for deploy in deploys:
+        deploy['steps'] = steps.get(deploy['seq'], [])
+    
+    return {
+        'deploys': deploys,
+        # Pass as ?before= for the next page
+        'next_before': deploys[-1]['seq'] if len(deploys) == limit else None
+    }
+
+def get_deploy_history_stats(filters):
+    """Per-project deploy counts, success rate and nearest-rank duration percentiles.
+    
+    Each percentile is read by offset along the (project_name, duration)
+    index instead of sorting every deploy of the project; the index also
+    covers the time and status filters, so no table rows are read.
+    """
+    where, params = deploy_history_filters(**filters)
+    connection = get_deploy_history_db()
+    rows = connection.execute(
+        "SELECT project_name, COUNT(*), SUM(status = 'succeeded'), COUNT(duration), AVG(duration), MAX(duration), "
+        f"MAX(finished_at) FROM deploys WHERE {where} GROUP BY project_name ORDER BY project_name", params
+    ).fetchall()
+    
+    projects = []
+    for project_name, count, succeeded, timed, avg, longest, last_finished_at in rows:
+        durations = {}
+        for name, fraction in (('p50', 0.5), ('p95', 0.95)):
+            durations[name] = connection.execute(
+                f'SELECT duration FROM deploys INDEXED BY deploys_project_duration WHERE {where} '
+                'AND project_name = ? AND duration IS NOT NULL ORDER BY duration LIMIT 1 OFFSET ?',
+                params + [project_name, max(0, math.ceil(fraction * timed) - 1)]
+            ).fetchone() if timed else None
+        projects.append({
+            'project_name': project_name,
+            'deploys': count,
+            'succeeded': succeeded,
+            'failed': count - succeeded,
+            'success_rate': round(succeeded / count, 4),
+            'avg': round(avg, 4) if avg is not None else None,
+            'p50': durations['p50'][0] if durations['p50'] else None,
+            'p95': durations['p95'][0] if durations['p95'] else None,
+            'max': longest,
+            'last_finished_at': last_finished_at
+        })
+    return {'projects': projects}
+
+# In-memory project index. The projects root is stat'ed at most every
+# PROJECT_INDEX_TTL seconds and rescanned only when its mtime changes (a
+# project was added, removed or renamed). Each project's own mtime is
+# rechecked in the background every PROJECT_INDEX_REFRESH seconds to pick up
+# a new .git or Dockerfile.
+project_index = {}
+project_index_mtimes = {}
+project_index_state = {'root_mtime': None, 'checked_at': 0.0, 'refreshed_at': 0.0, 'refreshing': False}
+project_index_lock = threading.Lock()
+project_scan_lock = threading.Lock()
+
+def get_project_folders():
+    """Get list of project folders, sorted by name"""
+    refresh_project_index()
+    with project_index_lock:
+        return [dict(project_index[name]) for name in sorted(project_index)]
+
+def scan_project(name):
+    """Build the index entry for one project with a single directory read"""
+    item_path = os.path.join(PROJECTS_PATH, name)
+    mtime = os.stat(item_path).st_mtime_ns
+    with os.scandir(item_path) as entries:
+        names = {entry.name for entry in entries}
+    return {
+        'name': name,
+        'path': item_path,
+        'has_git': '.git' in names,
+        'has_dockerfile': 'Dockerfile' in names
+    }, mtime
+
+def refresh_project_index():
+    """Bring the project index up to date if the projects root changed"""
+    if time.monotonic() - project_index_state['checked_at'] < PROJECT_INDEX_TTL:
+        return
+    
+    # Only the very first build makes callers wait; afterwards a concurrent
+    # refresh just serves the current index
+    built = project_index_state['root_mtime'] is not None
+    if not project_scan_lock.acquire(blocking=not built):
+        return
+    try:
+        now = time.monotonic()
+        if now - project_index_state['checked_at'] < PROJECT_INDEX_TTL:
+            return
+        project_index_state['checked_at'] = now
+        
+        try:
+            root_mtime = os.stat(PROJECTS_PATH).st_mtime_ns
+        except FileNotFoundError:
+            with project_index_lock:
+                project_index.clear()
+                project_index_mtimes.clear()
+            project_index_state['root_mtime'] = None
+            return
         
-        result['success'] = True
-        return jsonify(result)
+        if root_mtime != project_index_state['root_mtime']:
+            rescan_project_root()
+            project_index_state['root_mtime'] = root_mtime
+        elif now - project_index_state['refreshed_at'] >= PROJECT_INDEX_REFRESH and not project_index_state['refreshing']:
+            project_index_state['refreshing'] = True
+            threading.Thread(target=revalidate_project_index, name='project-index-refresh', daemon=True).start()
+    finally:
+        project_scan_lock.release()
+
+def rescan_project_root():
+    """Add new and drop removed projects; existing entries are kept as they are"""
+    with os.scandir(PROJECTS_PATH) as entries:
+        names = {entry.name for entry in entries if entry.is_dir()}
+    
+    with project_index_lock:
+        known = set(project_index)
+    
+    scanned = {}
+    for name in names - known:
+        try:
+            scanned[name] = scan_project(name)
+        except OSError as e:
+            logger.warning(f"Failed to index project {name}: {e}")
+    
+    with project_index_lock:
+        for name in known - names:
+            project_index.pop(name, None)
+            project_index_mtimes.pop(name, None)
+        for name, (project, mtime) in scanned.items():
+            project_index[name] = project
+            project_index_mtimes[name] = mtime
+    
+    logger.info(f"Project index rescanned: {len(names)} projects ({len(scanned)} new, {len(known - names)} removed)")
+
+def revalidate_project_index():
+    """Background pass re-indexing projects whose directory mtime changed"""
+    try:
+        with project_index_lock:
+            mtimes = dict(project_index_mtimes)
         
+        for name, mtime in mtimes.items():
+            try:
+                if os.stat(os.path.join(PROJECTS_PATH, name)).st_mtime_ns != mtime:
+                    refresh_project_entry(name)
+            except FileNotFoundError:
+                with project_index_lock:
+                    project_index.pop(name, None)
+                    project_index_mtimes.pop(name, None)
     except Exception as e:
-        logger.error(f"Deployment failed: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        logger.warning(f"Project index revalidation failed: {e}")
+    finally:
+        project_index_state['refreshed_at'] = time.monotonic()
+        project_index_state['refreshing'] = False
+
+def refresh_project_entry(name):
+    """Re-index a single project immediately (e.g. after a deploy changed it)"""
+    try:
+        project, mtime = scan_project(name)
+    except OSError:
+        return
+    with project_index_lock:
+        if name in project_index:
+            project_index[name] = project
+            project_index_mtimes[name] = mtime
+
+# Project details cache. Entries are reused while the mtimes of the files
+# they were derived from are unchanged and they are younger than
+# PROJECT_DETAILS_TTL (dirty state and size can change without touching them).
+project_details_cache = {}
+project_details_lock = threading.Lock()
+project_details_executor = ThreadPoolExecutor(max_workers=PROJECT_DETAILS_WORKERS, thread_name_prefix='project-details')
+
+def get_project_details(projects):
+    """Collect details for several projects in parallel, serving cached entries where valid"""
+    return list(project_details_executor.map(lambda project: get_cached_project_details(project['path']),
+                                             projects))
+
+def project_details_key(project_path):
+    """mtimes of every file a project's details are derived from"""
+    key = []
+    # The branch ref HEAD points to moves on commit and fetch without HEAD changing
+    branch_ref = None
+    try:
+        with open(os.path.join(project_path, '.git', 'HEAD')) as f:
+            head = f.read().strip()
+        if head.startswith('ref: '):
+            branch_ref = os.path.join('.git', head[5:])
+    except OSError:
+        pass
+    for relative in ('.', '.git/HEAD', branch_ref, '.git/index', '.git/packed-refs', '.git/refs/tags', 'version',
+                     'Dockerfile'):
+        if relative is None:
+            key.append(None)
+            continue
+        try:
+            key.append(os.stat(os.path.join(project_path, relative)).st_mtime_ns)
+        except OSError:
+            key.append(None)
+    return tuple(key)
+
+def get_cached_project_details(project_path):
+    """Details for one project from the cache, collecting them if stale"""
+    key = project_details_key(project_path)
+    now = time.monotonic()
+    with project_details_lock:
+        entry = project_details_cache.get(project_path)
+        if entry and entry['key'] == key and now - entry['collected_at'] < PROJECT_DETAILS_TTL:
+            CACHE_LOOKUPS.labels('project_details', 'hit').inc()
+            return entry['details']
+    
+    CACHE_LOOKUPS.labels('project_details', 'miss').inc()
+    details = collect_project_details(project_path)
+    with project_details_lock:
+        project_details_cache[project_path] = {'key': key, 'collected_at': now, 'details': details}
+    return details
+
+def collect_project_details(project_path):
+    """Read git state, version, Dockerfile base image and size for a project"""
+    details = {
+        'branch': None,
+        'head_commit': None,
+        'dirty': None,
+        'last_tag': None,
+        'version': None,
+        'base_image': None,
+        'size_bytes': None
+    }
+    
+    try:
+        with open(os.path.join(project_path, 'version'), 'r') as f:
+            details['version'] = f.read().strip()
+    except OSError:
+        pass
+    
+    try:
+        base_images = parse_dockerfile_base_images(os.path.join(project_path, 'Dockerfile'))
+        details['base_image'] = base_images[-1] if base_images else None
+    except OSError:
+        pass
+    
+    git_dir = os.path.join(project_path, '.git')
+    if os.path.isdir(git_dir):
+        details['branch'], details['head_commit'] = read_git_head(git_dir)
+        status = run_git(project_path, 'status', '--porcelain')
+        details['dirty'] = bool(status) if status is not None else None
+        details['last_tag'] = run_git(project_path, 'describe', '--tags', '--abbrev=0') or None
+    
+    details['size_bytes'] = get_directory_size(project_path)
+    return details
+
+def read_git_head(git_dir):
+    """Current branch and commit straight from .git files, without opening the repo"""
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), 'r') as f:
+            head = f.read().strip()
+    except OSError:
+        return None, None
+    
+    if not head.startswith('ref: '):
+        return None, head  # detached HEAD
+    
+    ref = head[len('ref: '):]
+    branch = ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ref
+    try:
+        with open(os.path.join(git_dir, ref), 'r') as f:
+            return branch, f.read().strip()
+    except OSError:
+        pass
+    
+    # Ref may only exist in packed-refs
+    try:
+        with open(os.path.join(git_dir, 'packed-refs'), 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return branch, parts[0]
+    except OSError:
+        pass
+    return branch, None  # no commits yet
+
+def run_git(project_path, *args):
+    """Run a read-only git command, returning its stripped output or None on failure"""
+    try:
+        result = subprocess.run(['git', '-c', 'safe.directory=*', '-C', project_path, *args],
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
 
-def get_project_folders():
-    """Get list of project folders"""
-    projects = []
-    if os.path.exists(PROJECTS_PATH):
-        for item in os.listdir(PROJECTS_PATH):
-            item_path = os.path.join(PROJECTS_PATH, item)
-            if os.path.isdir(item_path):
-                projects.append({
-                    'name': item,
-                    'path': item_path,
-                    'has_git': os.path.exists(os.path.join(item_path, '.git')),
-                    'has_dockerfile': os.path.exists(os.path.join(item_path, 'Dockerfile'))
-                })
-    return projects
-
-def push_to_github(project_path, repo_name, commit_message, project_version='v1.0.0'):
-    """Push project to GitHub with version tagging"""
+def parse_dockerfile_base_images(dockerfile_path):
+    """Images named in FROM lines, with references to earlier build stages resolved"""
+    stages = {}
+    images = []
+    with open(dockerfile_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].upper() != 'FROM':
+                continue
+            parts = [part for part in parts[1:] if not part.startswith('--')]
+            if not parts:
+                continue
+            image = stages.get(parts[0].lower(), parts[0])
+            if len(parts) >= 3 and parts[1].upper() == 'AS':
+                stages[parts[2].lower()] = image
+            images.append(image)
+    return images
+
+def get_directory_size(path):
+    """Total size in bytes of all files under path (symlinks not followed)"""
+    total = 0
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return total
+
+def write_version_file(project_path, project_version):
+    """Create or update the version file, leaving it untouched if unchanged"""
+    version_file_path = os.path.join(project_path, 'version')
+    try:
+        with open(version_file_path, 'r') as f:
+            if f.read() == project_version:
+                return
+    except FileNotFoundError:
+        pass
+    
+    with open(version_file_path, 'w') as f:
+        f.write(project_version)
+
+def push_to_github(project_path, repo_name, commit_message, project_version='v1.0.0', github_token=None,
+                   wait_for=None, fast_staging=False, force=False):
+    """Push project to GitHub with version tagging.
+    
+    If wait_for is given, repository changes are held back until that event
+    is set (used to let a concurrent Docker build snapshot the tree first).
+    With fast_staging, only paths git reports as changed are staged and the
+    commit is skipped when there are none. Unless force is set, nothing is
+    committed or pushed if this version was already pushed from the same
+    commit and the tree is clean (DEPLOY_SKIP_UNCHANGED); the result then
+    has 'skipped'. The result carries the duration of every phase under
+    'timings'.
+    """
+    timings = {}
+    started = time.perf_counter()
     try:
         # Fix Git safe directory issue first
-        subprocess.run(['git', 'config', '--global', '--add', 'safe.directory', project_path], 
-                      capture_output=True, check=False)
+        with timed_phase(timings, 'safe_directory'):
+            subprocess.run(['git', 'config', '--global', '--add', 'safe.directory', project_path], 
+                          capture_output=True, check=False)
         
-        # Initialize or open git repo
-        if not os.path.exists(os.path.join(project_path, '.git')):
-            repo = Repo.init(project_path)
-        else:
-            repo = Repo(project_path)
+        if wait_for:
+            with timed_phase(timings, 'wait_for_build_context'):
+                wait_for.wait()
         
-        # Configure git user if not set (required for commits)
-        try:
-            repo.config_reader().get_value("user", "name")
-        except:
-            repo.config_writer().set_value("user", "name", "Hub Helper").release()
-            repo.config_writer().set_value("user", "email", "hub-helper@automation.local").release()
+        with timed_phase(timings, 'open_repo'):
+            # Initialize or open git repo
+            if not os.path.exists(os.path.join(project_path, '.git')):
+                repo = Repo.init(project_path)
+            else:
+                repo = Repo(project_path)
+            
+            # Configure git user if not set (required for commits)
+            try:
+                repo.config_reader().get_value("user", "name")
+            except:
+                repo.config_writer().set_value("user", "name", "Hub Helper").release()
+                repo.config_writer().set_value("user", "email", "hub-helper@automation.local").release()
         
         # Create or update version file in the project
-        version_file_path = os.path.join(project_path, 'version')
-        with open(version_file_path, 'w') as f:
-            f.write(project_version)
+        with timed_phase(timings, 'version_file'):
+            write_version_file(project_path, project_version)
         
-        # Add all files
-        repo.git.add('.')
+        if DEPLOY_SKIP_UNCHANGED and not force:
+            with timed_phase(timings, 'fingerprint'):
+                unchanged = git_deploy_unchanged(repo, os.path.basename(project_path), repo_name, project_version)
+            if unchanged:
+                timings['total'] = round(time.perf_counter() - started, 4)
+                return {
+                    'step': 'GitHub Push',
+                    'success': True,
+                    'skipped': True,
+                    'message': f'{repo_name} is already at {project_version}, nothing to push',
+                    'committed': False,
+                    'tagged': True,
+                    'version': project_version,
+                    'timings': timings
+                }
         
-        # Commit changes
-        try:
-            repo.index.commit(commit_message)
-            committed = True
-        except Exception as e:
-            # Check if it's because there are no changes
-            if "nothing to commit" in str(e).lower():
-                committed = False
-            else:
-                raise e
+        staging = None
+        if fast_staging:
+            # Stage and commit only what git status reports as changed
+            with timed_phase(timings, 'add'):
+                staging = stage_changed_paths(project_path)
+            committed = False
+            if staging['changed_paths']:
+                with timed_phase(timings, 'commit'):
+                    repo.git.commit('--no-verify', '-m', commit_message)
+                committed = True
+        else:
+            # Add all files
+            with timed_phase(timings, 'add'):
+                repo.git.add('.')
+            
+            # Commit changes
+            try:
+                with timed_phase(timings, 'commit'):
+                    repo.index.commit(commit_message)
+                committed = True
+            except Exception as e:
+                # Check if it's because there are no changes
+                if "nothing to commit" in str(e).lower():
+                    committed = False
+                else:
+                    raise e
         
         # Create Git tag for version
         try:
-            # Delete existing tag if it exists
-            existing_tags = [tag.name for tag in repo.tags]
-            if project_version in existing_tags:
-                repo.delete_tag(project_version)
-            
-            # Create new tag
-            repo.create_tag(project_version, message=f'Release {project_version}')
+            with timed_phase(timings, 'tag'):
+                # Delete existing tag if it exists
+                existing_tags = [tag.name for tag in repo.tags]
+                if project_version in existing_tags:
+                    repo.delete_tag(project_version)
+                
+                # Create new tag
+                repo.create_tag(project_version, message=f'Release {project_version}')
             tagged = True
         except Exception as e:
             logger.warning(f"Failed to create tag {project_version}: {e}")
             tagged = False
         
         # Set remote if not exists
-        github_token = session.get('github_token')
+        if github_token is None:
+            github_token = session.get('github_token')
         remote_url = f"https://{github_token}@github.com/{repo_name}.git"
         
-        try:
-            origin = repo.remote('origin')
-            origin.set_url(remote_url)
-        except:
-            origin = repo.create_remote('origin', remote_url)
+        with timed_phase(timings, 'set_remote'):
+            try:
+                origin = repo.remote('origin')
+                origin.set_url(remote_url)
+            except:
+                origin = repo.create_remote('origin', remote_url)
         
         # Push to GitHub
-        current_branch = repo.active_branch.name if repo.heads else 'main'
-        origin.push(current_branch)
+        with timed_phase(timings, 'push'):
+            current_branch = repo.active_branch.name if repo.heads else 'main'
+            origin.push(current_branch)
         
         # Push tags
         if tagged:
             try:
-                origin.push(tags=True)
+                with timed_phase(timings, 'push_tags'):
+                    origin.push(tags=True)
                 tag_pushed = True
             except Exception as e:
                 logger.warning(f"Failed to push tags: {e}")
@@ -446,30 +2610,62 @@ def push_to_github(project_path, repo_name, commit_message, project_version='v1.
         message = f'Successfully pushed to {repo_name}'
         if tagged and tag_pushed:
             message += f' with tag {project_version}'
+            head = repo.head.commit
+            record_deploy_fingerprint(os.path.basename(project_path), github_repo=repo_name, version=project_version,
+                                      commit_sha=head.hexsha, tree_hash=head.tree.hexsha)
         
         # Track successful GitHub deployment
-        track_deployment_analytics('github')
+        track_deployment_analytics('github', os.path.basename(project_path))
         
-        return {
+        timings['total'] = round(time.perf_counter() - started, 4)
+        git_result = {
             'step': 'GitHub Push',
             'success': True,
             'message': message,
             'committed': committed,
             'tagged': tagged and tag_pushed,
-            'version': project_version
+            'version': project_version,
+            'timings': timings
         }
+        if staging:
+            git_result['staging'] = staging
+        return git_result
         
     except Exception as e:
+        timings['total'] = round(time.perf_counter() - started, 4)
         return {
             'step': 'GitHub Push',
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'timings': timings
         }
 
-def push_to_dockerhub(project_path, repo_name, project_version='v1.0.0'):
-    """Build and push Docker image to Docker Hub with version tagging"""
+def push_to_dockerhub(project_path, repo_name, project_version='v1.0.0', dockerhub_creds=None, progress=None,
+                      context_ready=None, deploy_id=None, build_engine=None, push_targets=None, platforms=None,
+                      force=False):
+    """Build and push Docker image to Docker Hub with version tagging.
+    
+    Build and push output is passed event by event to the optional
+    progress callback instead of being collected. context_ready, if given,
+    is set once the build context has been captured (or the build is
+    abandoned), after which the working tree may change. The image is
+    labelled with the deploy ID, project and build time. build_engine
+    selects the classic builder or BuildKit (default DOCKER_BUILD_ENGINE).
+    push_targets lists the repositories (or repository:tag refs) to push to
+    (default DOCKER_PUSH_TARGETS); each gets a report under 'pushes'.
+    platforms (e.g. ['linux/amd64', 'linux/arm64']) builds one image per
+    platform in parallel with BuildKit and pushes a manifest list instead.
+    Unless force is set, a single-platform deploy whose build fingerprint
+    and targets match the last successful push is reported as 'skipped'
+    without building or pushing (DEPLOY_SKIP_UNCHANGED).
+    The result carries the duration of every phase under 'timings'.
+    """
     client = None
     built_image = None
+    timings = {}
+    started = time.perf_counter()
+    deploy_id = deploy_id or uuid.uuid4().hex
+    build_engine = build_engine or DOCKER_BUILD_ENGINE
     
     try:
         dockerfile_path = os.path.join(project_path, 'Dockerfile')
@@ -477,18 +2673,19 @@ def push_to_dockerhub(project_path, repo_name, project_version='v1.0.0'):
             return {
                 'step': 'Docker Push',
                 'success': False,
-                'error': 'Dockerfile not found in project'
+                'error': 'Dockerfile not found in project',
+                'timings': timings
             }
         
-        client = docker.from_env()
-        dockerhub_creds = session.get('dockerhub_credentials')
+        with timed_phase(timings, 'client'):
+            client = get_docker_client()
+        if dockerhub_creds is None:
+            dockerhub_creds = session.get('dockerhub_credentials')
         
-        # Login to Docker Hub
-        client.login(
-            username=dockerhub_creds['username'],
-            password=dockerhub_creds['password'],
-            registry='https://index.docker.io/v1/'
-        )
+        # Login to Docker Hub (skipped if this user is already logged in on the shared client)
+        with timed_phase(timings, 'login'):
+            docker_login(client, dockerhub_creds['username'], dockerhub_creds['password'])
+        auth_config = {'username': dockerhub_creds['username'], 'password': dockerhub_creds['password']}
         
         # Clean version for Docker tag (remove 'v' prefix if present)
         docker_version = project_version.lstrip('v')
@@ -496,78 +2693,923 @@ def push_to_dockerhub(project_path, repo_name, project_version='v1.0.0'):
         # Build image with multiple tags
         image_name = f"{dockerhub_creds['username']}/{repo_name}"
         
-        # Build image with cleanup options
-        built_image, build_logs = client.images.build(
-            path=project_path,
-            tag=f"{image_name}:latest",
-            rm=True,  # Remove intermediate containers
-            forcerm=True,  # Always remove intermediate containers
-            pull=True,  # Always attempt to pull newer version of base image
-            nocache=False  # Use cache for faster builds
-        )
+        labels = {
+            DOCKER_MANAGED_LABEL: 'true',
+            DOCKER_DEPLOY_LABEL: deploy_id,
+            DOCKER_PROJECT_LABEL: os.path.basename(project_path),
+            DOCKER_BUILT_AT_LABEL: datetime.now().isoformat()
+        }
+        
+        # Pull base images only if their last check is older than BASE_IMAGE_PULL_TTL
+        with timed_phase(timings, 'base_images'):
+            base_images = refresh_base_images(client, dockerfile_path, auth_config, progress)
+        
+        targets = resolve_push_targets(image_name, repo_name, docker_version, push_targets)
+        project_name = os.path.basename(project_path)
+        platform_images = None
+        context_report = None
+        fingerprint = None
+        with open(dockerfile_path, 'rb') as f:
+            dockerfile_hash = hashlib.sha256(f.read()).hexdigest()
+        
+        if platforms:
+            # Platform images never reach the daemon: BuildKit pushes them by
+            # digest to the first target and the manifest lists reference them
+            source_repository = next(iter(targets))
+            with timed_phase(timings, 'build'):
+                platform_images = buildx_multiplatform_build(project_path, source_repository, platforms, labels,
+                                                             dockerhub_creds, progress, context_ready=context_ready,
+                                                             pull=base_images['pull_on_build'])
+            for platform_image in platform_images:
+                DOCKER_BYTES.labels('build').inc(platform_image['image_size'])
+            with timed_phase(timings, 'push'):
+                pushes = push_manifest_lists(source_repository, platform_images, targets, dockerhub_creds)
+        else:
+            # Both engines get the pruned context as a tar stream, so they
+            # build exactly the files that were fingerprinted
+            with timed_phase(timings, 'context_scan'):
+                context = scan_build_context(project_path)
+                fingerprint = build_fingerprint(client, context, dockerfile_path, build_engine, base_images)
+            context_report = {
+                'files': context['file_count'],
+                'bytes': context['bytes'],
+                'hashed_files': context['hashed'],
+                'fingerprint': context['fingerprint'],
+                'build_skipped': False
+            }
+            
+            pushed = docker_deploy_unchanged(project_name, fingerprint, targets) \
+                if DEPLOY_SKIP_UNCHANGED and not force else None
+            if pushed is not None:
+                # Same build inputs and tags as the last successful push
+                context_report['build_skipped'] = True
+                if context_ready:
+                    context_ready.set()
+                return {
+                    'step': 'Docker Push',
+                    'success': True,
+                    'skipped': True,
+                    'message': f"{', '.join(pushed)} already up to date, nothing to push",
+                    'version': docker_version,
+                    'tags': sorted({tag for tags in targets.values() for tag in tags}),
+                    'targets': list(targets),
+                    'build_engine': build_engine,
+                    'build_time': 0,
+                    'context': context_report,
+                    'base_images': base_images,
+                    'pushed_bytes': 0,
+                    'skipped_bytes': 0,
+                    'pushes': [{'target': target, 'digest': digest, 'skipped': True}
+                               for target, digest in pushed.items()],
+                    'timings': timings
+                }
+        
+            image_id = find_unchanged_build(client, image_name, fingerprint) if DOCKER_SKIP_UNCHANGED_BUILDS else None
+            if image_id:
+                # Same files, base images and engine as the last build of this image.
+                # Its labels (deploy id, build time) are still the original build's
+                context_report['build_skipped'] = True
+                context_report['reused_image'] = image_id
+                if context_ready:
+                    context_ready.set()
+                client.api.tag(image_id, image_name, 'latest')
+                if progress:
+                    progress({'type': 'build', 'stream': f'Build context unchanged, reusing image {image_id}\n'})
+            else:
+                with timed_phase(timings, 'build'):
+                    if build_engine == 'buildx':
+                        image_id = buildx_image_build(project_path, f"{image_name}:latest", labels, dockerhub_creds,
+                                                      progress, context_ready=context_ready,
+                                                      pull=base_images['pull_on_build'],
+                                                      context=stream_build_context(project_path, context['files'],
+                                                                                   context_report))
+                    else:
+                        # Build image with cleanup options, streaming each log line as it arrives
+                        # and the pruned context as it is read from disk
+                        image_id = stream_image_build(
+                            client,
+                            progress,
+                            context_ready=context_ready,
+                            timings=timings,
+                            fileobj=stream_build_context(project_path, context['files'], context_report),
+                            custom_context=True,
+                            tag=f"{image_name}:latest",
+                            labels=labels,
+                            rm=True,  # Remove intermediate containers
+                            forcerm=True,  # Always remove intermediate containers
+                            pull=base_images['pull_on_build'],  # Base images were refreshed above
+                            nocache=False  # Use cache for faster builds
+                        )
+                    DOCKER_BYTES.labels('context').inc(context_report['tar_bytes'])
+                record_build(image_name, fingerprint, image_id)
+        
+            # Tag for every target repository
+            with timed_phase(timings, 'tag'):
+                built_image = client.images.get(image_id)
+                for repository, tags in targets.items():
+                    for tag in tags:
+                        client.api.tag(image_id, repository, tag)
+            DOCKER_BYTES.labels('build').inc(built_image.attrs.get('Size') or 0)
         
-        # Tag with version
-        built_image.tag(image_name, docker_version)
+            # Push all targets concurrently, sharing layer uploads per registry
+            with timed_phase(timings, 'push'):
+                pushes = push_image_targets(client, targets, auth_config, progress)
+        
+        failed = [push['target'] for push in pushes if 'error' in push]
+        if failed:
+            # Some tags may already point at the new image
+            record_deploy_fingerprint(project_name, image_digests=None)
+            return {
+                'step': 'Docker Push',
+                'success': False,
+                'error': f"Push failed for {', '.join(failed)}",
+                'pushes': pushes,
+                'timings': timings
+            }
         
-        # Push both latest and version tags
-        push_logs_latest = client.images.push(image_name, tag='latest')
-        push_logs_version = client.images.push(image_name, tag=docker_version)
+        record_deploy_fingerprint(project_name, build_fingerprint=fingerprint, dockerfile_hash=dockerfile_hash,
+                                  docker_targets=json.dumps(targets),
+                                  image_digests=json.dumps({push['target']: push['digest'] for push in pushes}))
         
         # Clean up: remove old/unused images to save space
         try:
-            # Remove dangling images (untagged intermediate images)
-            client.images.prune(filters={'dangling': True})
+            # Remove dangling images left by earlier builds (e.g. the previous :latest)
+            with timed_phase(timings, 'prune'):
+                client.images.prune(filters={'dangling': True, 'label': DOCKER_MANAGED_FILTER})
             logger.info("Cleaned up dangling Docker images")
         except Exception as cleanup_error:
             logger.warning(f"Failed to clean up dangling images: {cleanup_error}")
         
         # Track successful Docker Hub deployment
-        track_deployment_analytics('dockerhub')
+        track_deployment_analytics('dockerhub', os.path.basename(project_path))
         
         return {
             'step': 'Docker Push',
             'success': True,
-            'message': f'Successfully pushed to {image_name}:latest and {image_name}:{docker_version}',
+            'message': f"Successfully pushed to {', '.join(push['target'] for push in pushes)}",
             'version': docker_version,
-            'tags': ['latest', docker_version]
+            'tags': sorted({tag for tags in targets.values() for tag in tags}),
+            'targets': list(targets),
+            'build_engine': 'buildx' if platforms else build_engine,
+            'build_time': timings.get('build', 0),
+            'context': context_report,
+            'build_fingerprint': fingerprint,
+            'base_images': base_images,
+            'platforms': platform_images,
+            'image_size': built_image.attrs.get('Size') if built_image else None,
+            'pushed_bytes': sum(push.get('pushed_bytes', 0) for push in pushes),
+            'skipped_bytes': sum(push.get('skipped_bytes', 0) for push in pushes),
+            'pushes': pushes,
+            'timings': timings
         }
         
     except Exception as e:
+        reset_docker_client_if_disconnected(e)
         return {
             'step': 'Docker Push',
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'timings': timings
         }
     finally:
-        # Additional cleanup in case of any issues
-        if client:
+        if context_ready:
+            context_ready.set()
+        
+        # The daemon already removes intermediate build containers (forcerm), so
+        # nothing is swept here. The returned dict holds this same timings
+        # dict, so the total still shows up in the result
+        timings['total'] = round(time.perf_counter() - started, 4)
+
+def stage_changed_paths(project_path):
+    """Stage only the paths `git status` reports as changed.
+    
+    Uses the untracked cache (and fsmonitor if GIT_FSMONITOR is set) so git
+    can skip unchanged directories, and feeds the changed paths to `git add`
+    through stdin instead of rescanning the whole worktree.
+    """
+    git_command = ['git', '-C', project_path, '-c', 'core.untrackedCache=true']
+    if GIT_FSMONITOR:
+        git_command += ['-c', f'core.fsmonitor={GIT_FSMONITOR}']
+    timings = {}
+    
+    started = time.perf_counter()
+    status = subprocess.run(git_command + ['status', '--porcelain=v1', '-z', '--untracked-files=all'],
+                            capture_output=True, check=True).stdout
+    timings['status'] = round(time.perf_counter() - started, 4)
+    
+    # Entries are "XY path" (X: index, Y: worktree). Staged renames and copies
+    # are followed by the original path, which needs no staging; neither do
+    # entries without worktree changes, though they still count as changes.
+    changed = 0
+    paths = []
+    entries = status.split(b'\0')
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if len(entry) < 4:
+            continue
+        changed += 1
+        if entry[1:2] != b' ':
+            paths.append(entry[3:])
+        if entry[:1] in (b'R', b'C'):
+            index += 1
+    
+    if paths:
+        started = time.perf_counter()
+        subprocess.run(git_command + ['--literal-pathspecs', 'add', '-A', '--pathspec-from-file=-',
+                                      '--pathspec-file-nul'],
+                       input=b'\0'.join(paths), capture_output=True, check=True)
+        timings['add'] = round(time.perf_counter() - started, 4)
+    
+    return {'mode': 'fast', 'changed_paths': changed, 'staged_paths': len(paths), 'timings': timings}
+
+def stream_image_build(client, progress, context_ready=None, timings=None, **build_kwargs):
+    """Run a build through the low-level API, forwarding each event to progress.
+    
+    Returns the built image ID. Nothing from the build output is retained
+    beyond the current event. If timings is given, the context upload is
+    recorded in it as 'build_context'.
+    """
+    image_id = None
+    # api.build() tars and uploads the context before returning the stream
+    with timed_phase(timings if timings is not None else {}, 'build_context'):
+        build_stream = client.api.build(decode=True, **build_kwargs)
+    if context_ready:
+        context_ready.set()
+    
+    for chunk in build_stream:
+        if 'error' in chunk:
+            raise docker.errors.BuildError(chunk['error'], [])
+        if 'aux' in chunk and 'ID' in chunk['aux']:
+            image_id = chunk['aux']['ID']
+        elif 'stream' in chunk:
+            match = re.search(r'Successfully built ([0-9a-f]+)', chunk['stream'])
+            if match:
+                image_id = match.group(1)
+        if progress:
+            progress({'type': 'build', **chunk})
+    
+    if not image_id:
+        raise docker.errors.BuildError('Unknown build failure: no image ID reported', [])
+    return image_id
+
+def buildx_image_build(project_path, tag, labels, dockerhub_creds, progress, context_ready=None, pull=True,
+                       context=None):
+    """Build with BuildKit through `docker buildx build` and load the image into the daemon.
+    
+    BuildKit runs independent stages in parallel. The layer cache is
+    imported and exported as configured by DOCKER_BUILD_CACHE; registry and
+    local caches need the docker-container driver, so they use the
+    DOCKER_BUILDX_BUILDER builder. If context (tar chunks) is given it is
+    sent on stdin instead of the project directory. Returns the built image ID.
+    """
+    if not shutil.which('docker'):
+        raise RuntimeError('The buildx build engine needs the docker CLI with the buildx plugin')
+    
+    repository = tag.rsplit(':', 1)[0]
+    command = ['docker', 'buildx', 'build', '--progress=plain', '--load', '--tag', tag]
+    for key, value in labels.items():
+        command += ['--label', f'{key}={value}']
+    if pull:
+        command.append('--pull')
+    command += buildx_cache_args(repository, tag)
+    if DOCKER_BUILD_CACHE in ('registry', 'local'):
+        command += ['--builder', ensure_buildx_builder()]
+    
+    with buildx_config(dockerhub_creds) as config_dir:
+        iid_file = os.path.join(config_dir, 'image-id')
+        run_buildx(command + ['--iidfile', iid_file, '-' if context is not None else project_path],
+                   config_dir, progress, context_ready, context=context)
+        with open(iid_file) as f:
+            return f.read().strip()
+
+def buildx_multiplatform_build(project_path, repository, platforms, labels, dockerhub_creds, progress,
+                               context_ready=None, pull=True):
+    """Build every platform in parallel with BuildKit and push each image by digest.
+    
+    Each platform is a separate `docker buildx build` on the DOCKER_BUILDX_BUILDER
+    builder (foreign platforms run under QEMU emulation), so a slow emulated
+    build does not hold up the native one. The untagged images are pushed to
+    repository for push_manifest_lists to assemble. Returns one report per
+    platform with its digest, build time and compressed image size.
+    """
+    if not shutil.which('docker'):
+        raise RuntimeError('Multi-platform builds need the docker CLI with the buildx plugin')
+    builder = ensure_buildx_builder()
+    transferred = {platform: threading.Event() for platform in platforms}
+    
+    def build(platform, config_dir):
+        suffix = '-' + re.sub(r'[^A-Za-z0-9_.-]', '-', platform)
+        metadata_file = os.path.join(config_dir, f'metadata{suffix}.json')
+        command = ['docker', 'buildx', 'build', '--progress=plain', '--builder', builder, '--platform', platform,
+                   '--output', f'type=image,name={repository},push-by-digest=true,name-canonical=true,push=true',
+                   # Attestations would turn the pushed digest into an index
+                   '--provenance=false', '--sbom=false', '--metadata-file', metadata_file]
+        for key, value in labels.items():
+            command += ['--label', f'{key}={value}']
+        if pull:
+            command.append('--pull')
+        command += buildx_cache_args(repository, f'{repository}:latest', suffix)
+        
+        started = time.perf_counter()
+        try:
+            run_buildx(command + [project_path], config_dir, progress, transferred[platform], platform=platform)
+        finally:
+            transferred[platform].set()
+        build_time = round(time.perf_counter() - started, 4)
+        
+        with open(metadata_file) as f:
+            digest = json.load(f)['containerimage.digest']
+        manifest = json.loads(run_buildx_imagetools(config_dir, 'inspect', '--raw', f'{repository}@{digest}'))
+        if 'manifests' in manifest:
+            # Still an index: size the image manifest for this platform
+            os_name, architecture, *variant = platform.split('/')
+            entry = next(entry for entry in manifest['manifests']
+                         if entry.get('platform', {}).get('os') == os_name
+                         and entry['platform'].get('architecture') == architecture
+                         and (not variant or entry['platform'].get('variant') == variant[0]))
+            manifest = json.loads(run_buildx_imagetools(config_dir, 'inspect', '--raw',
+                                                        f"{repository}@{entry['digest']}"))
+        image_size = manifest['config']['size'] + sum(layer['size'] for layer in manifest['layers'])
+        return {'platform': platform, 'digest': digest, 'build_time': build_time, 'image_size': image_size}
+    
+    with buildx_config(dockerhub_creds) as config_dir:
+        with ThreadPoolExecutor(max_workers=len(platforms), thread_name_prefix='buildx-platform') as platform_pool:
+            futures = [platform_pool.submit(build, platform, config_dir) for platform in platforms]
+            # The working tree may change once every platform has its context
+            for event in transferred.values():
+                event.wait()
+            if context_ready:
+                context_ready.set()
+            return [future.result() for future in futures]
+
+def push_manifest_lists(source_repository, platform_images, targets, dockerhub_creds):
+    """Create a manifest list of the platform images under every target tag.
+    
+    One `docker buildx imagetools create` per target repository, run
+    concurrently; the registry copies or mounts the platform images from
+    source_repository. Returns one report per repository with the
+    manifest list digest.
+    """
+    sources = [f"{source_repository}@{image['digest']}" for image in platform_images]
+    
+    with buildx_config(dockerhub_creds) as config_dir:
+        def push(repository, tags):
             try:
-                # Clean up any stopped containers from the build process
-                containers = client.containers.list(all=True, filters={'status': 'exited'})
-                for container in containers:
-                    # Only remove containers created in the last hour to avoid removing unrelated containers
-                    from datetime import datetime, timezone
-                    created_time = datetime.fromisoformat(container.attrs['Created'].replace('Z', '+00:00'))
-                    current_time = datetime.now(timezone.utc)
-                    if (current_time - created_time).total_seconds() < 3600:  # 1 hour
-                        try:
-                            container.remove(force=True)
-                            logger.info(f"Removed container: {container.short_id}")
-                        except Exception as remove_error:
-                            logger.warning(f"Failed to remove container {container.short_id}: {remove_error}")
-            except Exception as final_cleanup_error:
-                logger.warning(f"Failed during final cleanup: {final_cleanup_error}")
-            
-            # Close the Docker client connection
+                command = ['create']
+                for tag in tags:
+                    command += ['--tag', f'{repository}:{tag}']
+                run_buildx_imagetools(config_dir, *command, *sources)
+                descriptor = json.loads(run_buildx_imagetools(
+                    config_dir, 'inspect', f'{repository}:{tags[0]}', '--format', '{{json .Manifest}}'))
+                return {'target': repository, 'tags': tags, 'digest': descriptor.get('digest')}
+            except Exception as e:
+                logger.warning(f"Manifest list push to {repository} failed: {e}")
+                return {'target': repository, 'tags': tags, 'error': str(e)}
+        
+        workers = max(1, min(DOCKER_PUSH_WORKERS, len(targets)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='docker-push') as push_pool:
+            return list(push_pool.map(lambda target: push(*target), targets.items()))
+
+def buildx_cache_args(repository, tag, suffix=''):
+    """--cache-from/--cache-to arguments for DOCKER_BUILD_CACHE; suffix keeps per-platform caches apart"""
+    if DOCKER_BUILD_CACHE == 'registry':
+        cache_ref = f'{repository}:buildcache{suffix}'
+        return ['--cache-from', f'type=registry,ref={cache_ref}',
+                '--cache-to', f'type=registry,ref={cache_ref},mode=max']
+    if DOCKER_BUILD_CACHE == 'local':
+        cache_dir = os.path.join(DOCKER_BUILD_CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]', '_', repository) + suffix)
+        return ['--cache-from', f'type=local,src={cache_dir}',
+                '--cache-to', f'type=local,dest={cache_dir},mode=max']
+    if DOCKER_BUILD_CACHE == 'inline':
+        return ['--cache-from', tag, '--cache-to', 'type=inline']
+    return []
+
+@contextmanager
+def buildx_config(dockerhub_creds):
+    """Private Docker CLI config directory for one build.
+    
+    The CLI reads registry credentials from its config directory, so each
+    build gets one holding only this user's login.
+    """
+    with tempfile.TemporaryDirectory(prefix='hub-helper-docker-') as config_dir:
+        write_buildx_config(config_dir, dockerhub_creds)
+        yield config_dir
+
+def run_buildx(command, config_dir, progress=None, context_ready=None, platform=None, context=None):
+    """Run a buildx build, streaming its plain progress output line by line.
+    
+    context, if given, is an iterable of tar chunks written to the build's
+    stdin; context_ready is then set once all of it has been read.
+    """
+    tail = deque(maxlen=20)
+    process = subprocess.Popen(command, stdin=subprocess.PIPE if context is not None else None,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               env={**os.environ, 'DOCKER_CONFIG': config_dir})
+    writer_state = {'error': None}
+    
+    def write_context():
+        try:
+            for chunk in context:
+                process.stdin.buffer.write(chunk)
+        except BrokenPipeError:
+            pass  # buildx exited early; its exit code reports why
+        except Exception as e:
+            writer_state['error'] = e
+        finally:
             try:
-                client.close()
-            except:
+                process.stdin.close()
+            except BrokenPipeError:
                 pass
+            if context_ready:
+                context_ready.set()
+    
+    if context is not None:
+        writer = threading.Thread(target=write_context, name='buildx-context-writer', daemon=True)
+        writer.start()
+    try:
+        for line in process.stdout:
+            tail.append(line.rstrip('\n'))
+            # e.g. "#5 transferring context: 2.05kB done"
+            if context is None and context_ready and 'transferring context' in line and line.rstrip().endswith('done'):
+                context_ready.set()
+            if progress:
+                if platform:
+                    progress({'type': 'build', 'platform': platform, 'stream': f'[{platform}] {line}'})
+                else:
+                    progress({'type': 'build', 'stream': line})
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+        if context is not None:
+            writer.join()
+    
+    if writer_state['error']:
+        raise writer_state['error']
+    if returncode != 0:
+        what = f'buildx build for {platform}' if platform else 'buildx build'
+        raise docker.errors.BuildError(f"{what} failed (exit {returncode}): " + '\n'.join(tail), [])
+
+def run_buildx_imagetools(config_dir, *args):
+    """Run `docker buildx imagetools` and return its output"""
+    completed = subprocess.run(['docker', 'buildx', 'imagetools', *args], capture_output=True, text=True,
+                               env={**os.environ, 'DOCKER_CONFIG': config_dir})
+    if completed.returncode != 0:
+        raise docker.errors.APIError(f"imagetools {args[0]} failed: {completed.stderr.strip()}")
+    return completed.stdout
+
+buildx_builder_lock = threading.Lock()
+buildx_builder_state = {'ready': False}
+
+def ensure_buildx_builder():
+    """Create the docker-container BuildKit builder once per process"""
+    with buildx_builder_lock:
+        if not buildx_builder_state['ready']:
+            os.makedirs(os.path.join(DOCKER_BUILDX_CONFIG, 'buildx'), exist_ok=True)
+            link_user_cli_plugins(DOCKER_BUILDX_CONFIG)
+            env = {**os.environ, 'DOCKER_CONFIG': DOCKER_BUILDX_CONFIG}
+            inspect = subprocess.run(['docker', 'buildx', 'inspect', DOCKER_BUILDX_BUILDER],
+                                     capture_output=True, env=env)
+            if inspect.returncode != 0:
+                subprocess.run(['docker', 'buildx', 'create', '--name', DOCKER_BUILDX_BUILDER,
+                                '--driver', 'docker-container'], capture_output=True, check=True, env=env)
+                logger.info(f"Created buildx builder {DOCKER_BUILDX_BUILDER}")
+            buildx_builder_state['ready'] = True
+    return DOCKER_BUILDX_BUILDER
+
+def write_buildx_config(config_dir, dockerhub_creds):
+    """Docker CLI config with one registry login, sharing buildx state and CLI plugins"""
+    auth = base64.b64encode(f"{dockerhub_creds['username']}:{dockerhub_creds['password']}".encode()).decode()
+    with open(os.path.join(config_dir, 'config.json'), 'w') as f:
+        json.dump({'auths': {DOCKERHUB_REGISTRY: {'auth': auth}}}, f)
+    
+    # Builder instances live in DOCKER_BUILDX_CONFIG
+    os.makedirs(os.path.join(DOCKER_BUILDX_CONFIG, 'buildx'), exist_ok=True)
+    os.symlink(os.path.join(DOCKER_BUILDX_CONFIG, 'buildx'), os.path.join(config_dir, 'buildx'))
+    link_user_cli_plugins(config_dir)
+
+def link_user_cli_plugins(config_dir):
+    """Keep CLI plugins installed in ~/.docker (e.g. buildx) available under another config dir"""
+    user_plugins = os.path.expanduser('~/.docker/cli-plugins')
+    link = os.path.join(config_dir, 'cli-plugins')
+    if os.path.isdir(user_plugins) and not os.path.lexists(link):
+        os.symlink(user_plugins, link)
+
+# Build context cache. Content hashes of context files are kept per project
+# and only recomputed for files whose size or mtime changed; the fingerprint
+# of the last build of each image decides whether a build can be skipped.
+BUILD_CONTEXT_DB = os.path.join(DATA_DIR, 'build_context.db')
+build_context_db_local = threading.local()
+
+def get_build_context_db():
+    """Per-thread connection to the build context cache"""
+    connection = getattr(build_context_db_local, 'connection', None)
+    if connection is None:
+        connection = build_context_db_local.connection = connect_sqlite(BUILD_CONTEXT_DB)
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS context_files (
+                project TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (project, path)
+            );
+            CREATE TABLE IF NOT EXISTS context_builds (
+                image TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                image_id TEXT NOT NULL,
+                built_at TEXT NOT NULL
+            );
+        """)
+    return connection
+
+def scan_build_context(project_path):
+    """Paths that go into the build context, with a fingerprint of their contents.
+    
+    Applies DOCKER_CONTEXT_EXCLUDES and the project's .dockerignore, the
+    same way the Docker CLI matches them.
+    """
+    patterns = list(DOCKER_CONTEXT_EXCLUDES)
+    dockerignore_path = os.path.join(project_path, '.dockerignore')
+    if os.path.exists(dockerignore_path):
+        with open(dockerignore_path, 'r') as f:
+            patterns += [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    files = sorted(docker.utils.build.exclude_paths(project_path, patterns, dockerfile='Dockerfile'))
+    
+    connection = get_build_context_db()
+    cached = {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in connection.execute(
+        'SELECT path, size, mtime_ns, digest FROM context_files WHERE project = ?', (project_path,))}
+    
+    fingerprint = hashlib.sha256()
+    updated = []
+    file_count = total_bytes = 0
+    for path in files:
+        full_path = os.path.join(project_path, path)
+        info = os.lstat(full_path)
+        if stat.S_ISREG(info.st_mode):
+            entry = cached.pop(path, None)
+            if entry and entry[:2] == (info.st_size, info.st_mtime_ns):
+                digest = entry[2]
+            else:
+                digest = hash_file(full_path)
+                updated.append((project_path, path, info.st_size, info.st_mtime_ns, digest))
+            file_count += 1
+            total_bytes += info.st_size
+        elif stat.S_ISLNK(info.st_mode):
+            digest = os.readlink(full_path)
+        else:
+            digest = ''
+        fingerprint.update(f'{path}\0{info.st_mode}\0{digest}\n'.encode())
+    
+    with connection:
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('INSERT OR REPLACE INTO context_files VALUES (?, ?, ?, ?, ?)', updated)
+        # Whatever is left in cached is no longer part of the context
+        connection.executemany('DELETE FROM context_files WHERE project = ? AND path = ?',
+                               [(project_path, path) for path in cached])
+    
+    return {'files': files, 'file_count': file_count, 'bytes': total_bytes, 'hashed': len(updated),
+            'fingerprint': fingerprint.hexdigest()}
+
+def hash_file(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stream_build_context(project_path, files, report):
+    """Yield a tar of the context files as it is written, never holding it whole.
+    
+    A background thread writes the archive into a pipe, so memory use stays
+    at one pipe buffer however large the context is. The number of bytes
+    sent is stored in report['tar_bytes'].
+    """
+    read_fd, write_fd = os.pipe()
+    writer_state = {'error': None}
+    
+    def write_archive():
+        try:
+            with os.fdopen(write_fd, 'wb') as pipe, tarfile.open(fileobj=pipe, mode='w|') as archive:
+                for path in files:
+                    full_path = os.path.join(project_path, path)
+                    info = archive.gettarinfo(full_path, arcname=path)
+                    if info is None:
+                        continue  # sockets and the like can't be archived
+                    if info.isfile():
+                        with open(full_path, 'rb') as f:
+                            archive.addfile(info, f)
+                    else:
+                        archive.addfile(info)
+        except Exception as e:
+            writer_state['error'] = e
+    
+    writer = threading.Thread(target=write_archive, name='build-context-writer', daemon=True)
+    writer.start()
+    report['tar_bytes'] = 0
+    with os.fdopen(read_fd, 'rb') as pipe:
+        for chunk in iter(lambda: pipe.read(64 * 1024), b''):
+            report['tar_bytes'] += len(chunk)
+            yield chunk
+    writer.join()
+    if writer_state['error']:
+        raise writer_state['error']
+
+def build_fingerprint(client, context, dockerfile_path, build_engine, base_images):
+    """Fingerprint of everything a build depends on, or None if it can't be determined"""
+    if base_images['pull_on_build']:
+        return None
+    
+    base_image_ids = []
+    for image in dict.fromkeys(parse_dockerfile_base_images(dockerfile_path)):
+        if image.lower() == 'scratch':
+            continue
+        try:
+            base_image_ids.append(client.api.inspect_image(image)['Id'])
+        except docker.errors.NotFound:
+            return None
+    return hashlib.sha256(f"{build_engine}\0{context['fingerprint']}\0{','.join(base_image_ids)}".encode()).hexdigest()
+
+def find_unchanged_build(client, image_name, fingerprint):
+    """ID of the last image built for image_name if it had the same fingerprint and still exists"""
+    if fingerprint is None:
+        return None
+    row = get_build_context_db().execute(
+        'SELECT image_id FROM context_builds WHERE image = ? AND fingerprint = ?', (image_name, fingerprint)
+    ).fetchone()
+    if not row:
+        return None
+    try:
+        client.api.inspect_image(row[0])
+    except docker.errors.NotFound:
+        return None
+    return row[0]
+
+def record_build(image_name, fingerprint, image_id):
+    """Remember the fingerprint of a successful build"""
+    if fingerprint is None:
+        return
+    get_build_context_db().execute(
+        'INSERT OR REPLACE INTO context_builds (image, fingerprint, image_id, built_at) VALUES (?, ?, ?, ?)',
+        (image_name, fingerprint, image_id, datetime.now().isoformat())
+    )
+
+# Deploy fingerprints. For every project the state of its last successful
+# GitHub push (repository, version, commit and tree) and Docker push (build
+# fingerprint, Dockerfile hash, target tags and pushed digests) is kept, so a
+# redeploy of unchanged work is reported as a no-op instead of redone.
+DEPLOY_FINGERPRINTS_DB = os.path.join(DATA_DIR, 'deploy_fingerprints.db')
+DEPLOY_FINGERPRINT_COLUMNS = ('github_repo', 'version', 'commit_sha', 'tree_hash', 'build_fingerprint',
+                              'dockerfile_hash', 'docker_targets', 'image_digests')
+deploy_fingerprints_db_local = threading.local()
+
+def get_deploy_fingerprints_db():
+    """Per-thread connection to the deploy fingerprint store"""
+    connection = getattr(deploy_fingerprints_db_local, 'connection', None)
+    if connection is None:
+        connection = deploy_fingerprints_db_local.connection = connect_sqlite(DEPLOY_FINGERPRINTS_DB)
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS deploy_fingerprints (
+                project TEXT PRIMARY KEY,
+                github_repo TEXT,
+                version TEXT,
+                commit_sha TEXT,
+                tree_hash TEXT,
+                build_fingerprint TEXT,
+                dockerfile_hash TEXT,
+                docker_targets TEXT,
+                image_digests TEXT,
+                updated_at TEXT NOT NULL
+            );
+        """)
+    return connection
+
+def get_deploy_fingerprint(project_name):
+    """Last recorded deploy state of a project (empty if none)"""
+    row = get_deploy_fingerprints_db().execute(
+        f"SELECT {', '.join(DEPLOY_FINGERPRINT_COLUMNS)} FROM deploy_fingerprints WHERE project = ?",
+        (project_name,)
+    ).fetchone()
+    return dict(zip(DEPLOY_FINGERPRINT_COLUMNS, row)) if row else {}
+
+def record_deploy_fingerprint(project_name, **fields):
+    """Update some of a project's fingerprint columns, keeping the others"""
+    columns = ', '.join(fields)
+    updates = ', '.join(f'{column} = excluded.{column}' for column in fields)
+    get_deploy_fingerprints_db().execute(
+        f"INSERT INTO deploy_fingerprints (project, updated_at, {columns}) VALUES (?, ?{', ?' * len(fields)}) "
+        f"ON CONFLICT (project) DO UPDATE SET updated_at = excluded.updated_at, {updates}",
+        (project_name, datetime.now().isoformat(), *fields.values())
+    )
+
+def git_deploy_unchanged(repo, project_name, repo_name, project_version):
+    """Whether HEAD, its tree and the version tag are what the last successful push left, with a clean tree"""
+    record = get_deploy_fingerprint(project_name)
+    if not record or (record['github_repo'], record['version']) != (repo_name, project_version):
+        return False
+    if not repo.head.is_valid() or project_version not in [tag.name for tag in repo.tags]:
+        return False
+    head = repo.head.commit
+    return (head.hexsha == record['commit_sha'] and head.tree.hexsha == record['tree_hash']
+            and repo.tags[project_version].commit == head and not repo.is_dirty(untracked_files=True))
+
+def docker_deploy_unchanged(project_name, fingerprint, targets):
+    """Digests of the last successful push if it had the same build fingerprint and targets, else None"""
+    record = get_deploy_fingerprint(project_name)
+    if fingerprint is None or not record.get('image_digests'):
+        return None
+    if record['build_fingerprint'] != fingerprint or json.loads(record['docker_targets']) != targets:
+        return None
+    return json.loads(record['image_digests'])
+
+# Base image freshness. Instead of pull=True on every build (a registry round
+# trip per FROM image, counted against Docker Hub's rate limit), each base
+# image is pulled at most once per BASE_IMAGE_PULL_TTL seconds for all
+# projects and worker processes, and builds use the local copy.
+BASE_IMAGES_DB = os.path.join(DATA_DIR, 'base_images.db')
+base_images_db_local = threading.local()
+base_image_locks = {}
+base_image_locks_lock = threading.Lock()
+
+def get_base_images_db():
+    """Per-thread connection to the base image freshness store"""
+    connection = getattr(base_images_db_local, 'connection', None)
+    if connection is None:
+        connection = base_images_db_local.connection = connect_sqlite(BASE_IMAGES_DB)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS base_images (
+                image TEXT PRIMARY KEY,
+                digest TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+    return connection
+
+def refresh_base_images(client, dockerfile_path, auth_config=None, progress=None):
+    """Pull the Dockerfile's base images that are missing or past BASE_IMAGE_PULL_TTL.
+    
+    Returns the pulled and cached images. pull_on_build is set when the
+    builder still has to check the registry itself: the TTL is 0 or a FROM
+    line can't be resolved here (e.g. it uses a build ARG).
+    """
+    report = {'pulled': [], 'cached': [], 'pull_on_build': BASE_IMAGE_PULL_TTL <= 0}
+    if report['pull_on_build']:
+        return report
+    
+    for image in dict.fromkeys(parse_dockerfile_base_images(dockerfile_path)):
+        if image.lower() == 'scratch':
+            continue
+        if '$' in image:
+            report['pull_on_build'] = True
+            continue
+        
+        # Concurrent deploys on the same base wait for one pull
+        with base_image_locks_lock:
+            lock = base_image_locks.setdefault(image, threading.Lock())
+        with lock:
+            if is_base_image_fresh(client, image):
+                CACHE_LOOKUPS.labels('base_image', 'hit').inc()
+                report['cached'].append(image)
+            else:
+                CACHE_LOOKUPS.labels('base_image', 'miss').inc()
+                report['pulled'].append(pull_base_image(client, image, auth_config, progress))
+    return report
+
+def is_base_image_fresh(client, image):
+    """Whether a base image is present locally and was checked within the TTL"""
+    try:
+        client.api.inspect_image(image)
+    except docker.errors.NotFound:
+        return False
+    
+    # A digest reference can't change
+    if '@' in image:
+        return True
+    row = get_base_images_db().execute('SELECT checked_at FROM base_images WHERE image = ?', (image,)).fetchone()
+    return row is not None and time.time() - row[0] < BASE_IMAGE_PULL_TTL
+
+def pull_base_image(client, image, auth_config=None, progress=None):
+    """Pull a base image and record its digest and check time.
+    
+    auth_config holds Docker Hub credentials, so it is only sent for
+    Docker Hub images; other registries use the client's own configuration.
+    """
+    repository, tag = docker.utils.parse_repository_tag(image)
+    if docker.auth.resolve_repository_name(repository)[0] != docker.auth.INDEX_NAME:
+        auth_config = None
+    for chunk in client.api.pull(repository, tag=tag or 'latest', stream=True, decode=True,
+                                 auth_config=auth_config):
+        if 'error' in chunk:
+            raise docker.errors.APIError(f"Pull of {image} failed: {chunk['error']}")
+        if progress:
+            progress({'type': 'pull', 'image': image, **chunk})
+    
+    digests = client.api.inspect_image(image).get('RepoDigests') or []
+    digest = digests[0].split('@', 1)[1] if digests else None
+    connection = get_base_images_db()
+    previous = connection.execute('SELECT digest FROM base_images WHERE image = ?', (image,)).fetchone()
+    connection.execute('INSERT OR REPLACE INTO base_images (image, digest, checked_at) VALUES (?, ?, ?)',
+                       (image, digest, time.time()))
+    return {'image': image, 'digest': digest, 'updated': previous is not None and previous[0] != digest}
+
+def resolve_push_targets(image_name, repo_name, docker_version, push_targets=None):
+    """Expand target refs into {repository: [tags]}, in the order given.
+    
+    A ref without a tag gets the latest and version tags.
+    """
+    targets = {}
+    for ref in push_targets or DOCKER_PUSH_TARGETS:
+        repository, tag = docker.utils.parse_repository_tag(ref.format(image=image_name, repo=repo_name))
+        tags = targets.setdefault(repository, [])
+        for target_tag in ([tag] if tag else ['latest', docker_version]):
+            if target_tag not in tags:
+                tags.append(target_tag)
+    return targets
+
+def push_image_targets(client, targets, auth_config=None, progress=None):
+    """Push the tags of every target repository concurrently.
+    
+    Pushes are grouped by registry: the first tag of each registry goes
+    first, then every other tag of that registry, which then only finds
+    existing (or cross-repository mounted) layers instead of uploading
+    them again. auth_config is only sent to Docker Hub; other registries
+    use the client's own configuration. Returns one report per tag, with
+    the seconds its push took.
+    """
+    by_registry = {}
+    for repository, tags in targets.items():
+        for tag in tags:
+            registry = docker.auth.resolve_repository_name(repository)[0]
+            by_registry.setdefault(registry, []).append((repository, tag))
+    
+    # Layer sizes seen by any push of this image, to size the layers other pushes skip
+    layer_sizes = {}
+    
+    def push(repository, tag):
+        registry = docker.auth.resolve_repository_name(repository)[0]
+        target_auth = auth_config if registry == docker.auth.INDEX_NAME else None
+        started = time.perf_counter()
+        try:
+            report = stream_image_push(client, progress, repository, tag, target_auth, layer_sizes)
+        except Exception as e:
+            logger.warning(f"Push of {repository}:{tag} failed: {e}")
+            report = {'target': f'{repository}:{tag}', 'error': str(e)}
+        report['duration'] = round(time.perf_counter() - started, 4)
+        return report
+    
+    first_wave = [pushes[0] for pushes in by_registry.values()]
+    second_wave = [target for pushes in by_registry.values() for target in pushes[1:]]
+    workers = max(1, min(DOCKER_PUSH_WORKERS, max(len(first_wave), len(second_wave))))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='docker-push') as push_pool:
+        reports = list(push_pool.map(lambda target: push(*target), first_wave))
+        reports.extend(push_pool.map(lambda target: push(*target), second_wave))
+    return reports
+
+def stream_image_push(client, progress, repository, tag, auth_config=None, layer_sizes=None):
+    """Push a tag through the low-level API, forwarding layer progress events.
+    
+    auth_config is passed explicitly so concurrent pushes for different users
+    on the shared client never pick up each other's registry login. Returns
+    the layer bytes uploaded and skipped (already on the registry or mounted
+    from another repository) and the pushed digest. A skipped layer's size
+    is only known if this or another push sharing layer_sizes saw it.
+    """
+    layer_sizes = layer_sizes if layer_sizes is not None else {}
+    report = {'target': f'{repository}:{tag}', 'pushed_bytes': 0, 'skipped_bytes': 0,
+              'layers_pushed': 0, 'layers_skipped': 0, 'digest': None}
+    skipped = []
+    for chunk in client.api.push(repository, tag=tag, stream=True, decode=True, auth_config=auth_config):
+        if 'error' in chunk:
+            raise docker.errors.APIError(chunk['error'])
+        layer = chunk.get('id')
+        status = chunk.get('status') or ''
+        total = (chunk.get('progressDetail') or {}).get('total')
+        if layer and total:
+            layer_sizes[layer] = total
+        elif layer and status == 'Pushed':
+            report['layers_pushed'] += 1
+            report['pushed_bytes'] += layer_sizes.get(layer, 0)
+        elif layer and (status == 'Layer already exists' or status.startswith('Mounted from')):
+            report['layers_skipped'] += 1
+            skipped.append(layer)
+        if 'aux' in chunk:
+            report['digest'] = chunk['aux'].get('Digest')
+        if progress:
+            progress({'type': 'push', 'tag': tag, 'target': report['target'], **chunk})
+    
+    # Sizes of skipped layers may come from a push that finished meanwhile
+    report['skipped_bytes'] = sum(layer_sizes.get(layer, 0) for layer in skipped)
+    DOCKER_BYTES.labels('push').inc(report['pushed_bytes'])
+    return report
 
 @app.route('/logout')
 def logout():
     """Clear session and persistent credentials"""
     session.clear()
+    clear_validation_cache()
     # Remove persistent credentials file
     if os.path.exists(CREDENTIALS_FILE):
         os.remove(CREDENTIALS_FILE)
@@ -590,10 +3632,11 @@ def auth_status():
         
         # Validate stored credentials
         if 'github_token' in saved_creds:
-            status['github_token_valid'] = validate_github_token(saved_creds['github_token'])
+            status['github_token_valid'] = is_github_token_valid(saved_creds['github_token'])
         if 'dockerhub_credentials' in saved_creds:
-            status['dockerhub_creds_valid'] = validate_dockerhub_credentials(saved_creds['dockerhub_credentials'])
+            status['dockerhub_creds_valid'] = are_dockerhub_credentials_valid(saved_creds['dockerhub_credentials'])
     
+    status['validation_cache'] = get_validation_cache_stats()
     return jsonify(status)
 
 @app.route('/version')
@@ -614,96 +3657,348 @@ def get_version():
 
 @app.route('/cleanup/docker', methods=['POST'])
 def cleanup_docker():
-    """Clean up Docker containers and images"""
+    """Clean up Docker containers and images.
+    
+    Optional JSON body: dry_run (report what would be removed), older_than
+    (seconds; only containers and images created before that), labels (list
+    of "key" or "key=value" filters), build_cache (also prune the builder
+    cache) and scope ("hub-helper", the default, for only artifacts Hub
+    Helper built, or "all" for the whole host).
+    """
+    options = request.get_json(silent=True) or {}
+    scope = options.get('scope', 'hub-helper')
+    if scope not in ('hub-helper', 'all'):
+        return jsonify({'success': False, 'error': 'scope must be "hub-helper" or "all"'}), 400
+    labels = list(options.get('labels') or [])
+    if scope == 'hub-helper':
+        labels.append(DOCKER_MANAGED_FILTER)
+    try:
+        older_than = int(options['older_than']) if options.get('older_than') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'older_than must be a number of seconds'}), 400
+    
     try:
-        client = docker.from_env()
+        report = run_docker_cleanup(
+            get_docker_client(),
+            container_age=older_than,
+            image_age=older_than,
+            labels=labels,
+            build_cache=bool(options.get('build_cache')),
+            dry_run=bool(options.get('dry_run'))
+        )
         cleanup_results = {
-            'containers_removed': 0,
-            'images_removed': 0,
-            'space_reclaimed': '0 MB'
+            **report,
+            'scope': scope,
+            'containers_removed': report['containers']['removed'],
+            'images_removed': report['images']['removed'],
+            'space_reclaimed': f"{report['space_reclaimed'] / 1024 / 1024:.2f} MB",
+            'space_reclaimed_bytes': report['space_reclaimed']
         }
         
-        # Remove stopped containers
-        containers = client.containers.list(all=True, filters={'status': 'exited'})
-        for container in containers:
-            try:
-                container.remove(force=True)
-                cleanup_results['containers_removed'] += 1
-                logger.info(f"Removed stopped container: {container.short_id}")
-            except Exception as e:
-                logger.warning(f"Failed to remove container {container.short_id}: {e}")
-        
-        # Remove created but not started containers
-        created_containers = client.containers.list(all=True, filters={'status': 'created'})
-        for container in created_containers:
-            try:
-                container.remove(force=True)
-                cleanup_results['containers_removed'] += 1
-                logger.info(f"Removed created container: {container.short_id}")
-            except Exception as e:
-                logger.warning(f"Failed to remove container {container.short_id}: {e}")
-        
-        # Remove dangling images
-        try:
-            pruned = client.images.prune(filters={'dangling': True})
-            cleanup_results['images_removed'] = len(pruned.get('ImagesDeleted', []))
-            space_reclaimed = pruned.get('SpaceReclaimed', 0)
-            cleanup_results['space_reclaimed'] = f"{space_reclaimed / 1024 / 1024:.2f} MB"
-            logger.info(f"Removed {cleanup_results['images_removed']} dangling images, reclaimed {cleanup_results['space_reclaimed']}")
-        except Exception as e:
-            logger.warning(f"Failed to prune images: {e}")
-        
-        # Close client
-        client.close()
-        
+        verb = 'would be removed' if report['dry_run'] else 'removed'
         return jsonify({
             'success': True,
-            'message': f"Cleanup completed: {cleanup_results['containers_removed']} containers and {cleanup_results['images_removed']} images removed",
+            'message': f"Cleanup completed: {cleanup_results['containers_removed']} containers and {cleanup_results['images_removed']} images {verb}",
             'details': cleanup_results
         })
         
     except Exception as e:
+        reset_docker_client_if_disconnected(e)
         logger.error(f"Docker cleanup failed: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def run_docker_cleanup(client, container_age=None, created_age=None, image_age=None, labels=None,
+                       images=True, build_cache=False, dry_run=False):
+    """Remove stopped containers, dangling images and optionally build cache.
+    
+    Filtering is done by the daemon: stopped containers older than
+    container_age seconds (all if None) and dangling images older than
+    image_age go through the prune endpoints, restricted to labels if given.
+    Created-but-never-started containers older than the shorter created_age
+    are removed individually on a bounded pool. Returns removed counts and
+    reclaimed bytes per category; with dry_run nothing is removed and the
+    bytes are the daemon's size estimates.
+    """
+    report = {'dry_run': dry_run, 'containers': {'removed': 0, 'space_reclaimed': 0}, 
+              'images': {'removed': 0, 'space_reclaimed': 0}, 'errors': []}
+    label_filter = {'label': list(labels)} if labels else {}
+    now = time.time()
+    
+    # Stopped containers: one prune call
+    container_filters = dict(label_filter)
+    if container_age is not None:
+        container_filters['until'] = f'{int(container_age)}s'
+    if dry_run:
+        candidates = [container for container in client.api.containers(
+                          all=True, size=True, filters={'status': ['exited', 'created', 'dead'], **label_filter})
+                      if container_age is None or container['Created'] <= now - container_age]
+        pruned_ids = {container['Id'] for container in candidates}
+        report['containers']['removed'] = len(candidates)
+        report['containers']['space_reclaimed'] = sum(container.get('SizeRw') or 0 for container in candidates)
+    else:
+        pruned = client.api.prune_containers(filters=container_filters)
+        pruned_ids = set(pruned.get('ContainersDeleted') or [])
+        report['containers']['removed'] = len(pruned_ids)
+        report['containers']['space_reclaimed'] = pruned.get('SpaceReclaimed') or 0
+    
+    # Containers that were created but never started are collected sooner
+    if created_age is not None and (container_age is None or created_age < container_age):
+        leftovers = [container for container in client.api.containers(
+                         all=True, size=True, filters={'status': 'created', **label_filter})
+                     if container['Created'] <= now - created_age and container['Id'] not in pruned_ids]
+        if dry_run:
+            removed = leftovers
+        else:
+            removed = []
+            with ThreadPoolExecutor(max_workers=DOCKER_CLEANUP_WORKERS, thread_name_prefix='docker-cleanup') as pool:
+                futures = {pool.submit(client.api.remove_container, container['Id'], force=True): container
+                           for container in leftovers}
+                for future, container in futures.items():
+                    try:
+                        future.result()
+                        removed.append(container)
+                    except Exception as e:
+                        report['errors'].append(f"container {container['Id'][:12]}: {e}")
+        report['containers']['removed'] += len(removed)
+        report['containers']['space_reclaimed'] += sum(container.get('SizeRw') or 0 for container in removed)
+    
+    # Dangling images: one prune call
+    if images:
+        image_filters = {'dangling': True, **label_filter}
+        if image_age is not None:
+            image_filters['until'] = f'{int(image_age)}s'
+        if dry_run:
+            candidates = [image for image in client.api.images(filters={'dangling': True, **label_filter})
+                          if image_age is None or image['Created'] <= now - image_age]
+            report['images']['removed'] = len(candidates)
+            report['images']['space_reclaimed'] = sum(image.get('Size') or 0 for image in candidates)
+        else:
+            pruned = client.api.prune_images(filters=image_filters)
+            report['images']['removed'] = sum(1 for item in pruned.get('ImagesDeleted') or [] if 'Deleted' in item)
+            report['images']['space_reclaimed'] = pruned.get('SpaceReclaimed') or 0
+    
+    if build_cache:
+        if dry_run:
+            caches = [cache for cache in client.api.df().get('BuildCache') or [] if not cache.get('InUse')]
+            report['build_cache'] = {'removed': len(caches),
+                                     'space_reclaimed': sum(cache.get('Size') or 0 for cache in caches)}
+        else:
+            pruned = client.api.prune_builds()
+            report['build_cache'] = {'removed': len(pruned.get('CachesDeleted') or []),
+                                     'space_reclaimed': pruned.get('SpaceReclaimed') or 0}
+    
+    report['space_reclaimed'] = sum(report[category]['space_reclaimed']
+                                    for category in ('containers', 'images', 'build_cache') if category in report)
+    logger.info(f"Docker cleanup{' (dry run)' if dry_run else ''}: {report['containers']['removed']} containers, "
+                f"{report['images']['removed']} images, {report['space_reclaimed'] / 1024 / 1024:.2f} MB")
+    return report
+
+# In-memory inventory of the Docker host's containers and images behind
+# /system/status. It is seeded with one list call each and then kept current
+# from the daemon's events stream, with running totals updated per event so a
+# status read never touches the daemon. A full resync happens when the stream
+# reconnects and, on the next event, once DOCKER_INVENTORY_RESYNC seconds have
+# passed, to correct anything events don't describe.
+docker_inventory = {'containers': {}, 'images': {}, 'totals': {}, 'docker_version': None,
+                    'synced_at': None, 'events': 0, 'connected': False, 'error': None}
+docker_inventory_lock = threading.Lock()
+docker_inventory_ready = threading.Event()
+docker_inventory_state = {'started': False}
+DOCKER_CONTAINER_EVENT_STATES = {'create': 'created', 'start': 'running', 'restart': 'running',
+                                 'unpause': 'running', 'pause': 'paused', 'die': 'exited'}
+
+def start_docker_inventory():
+    """Start following the Docker events stream once per process"""
+    with docker_inventory_lock:
+        if docker_inventory_state['started']:
+            return
+        docker_inventory_state['started'] = True
+    threading.Thread(target=run_docker_inventory, name='docker-inventory', daemon=True).start()
+
+def run_docker_inventory():
+    """Seed the inventory and apply Docker events to it, reconnecting with backoff"""
+    delay = 1
+    while True:
+        try:
+            client = get_docker_client()
+            # Subscribe before seeding so nothing that happens in between is missed
+            events = client.api.events(since=int(time.time()), decode=True,
+                                       filters={'type': ['container', 'image']})
+            try:
+                seed_docker_inventory(client)
+                delay = 1
+                for event in events:
+                    apply_docker_event(client, event)
+                    if time.time() - docker_inventory['synced_at'] >= DOCKER_INVENTORY_RESYNC:
+                        seed_docker_inventory(client)
+            finally:
+                events.close()
+            raise ConnectionError('Docker events stream ended')
+        except Exception as e:
+            reset_docker_client_if_disconnected(e)
+            with docker_inventory_lock:
+                docker_inventory['connected'] = False
+                docker_inventory['error'] = str(e)
+            # Let waiting requests fail fast instead of waiting for the first seed
+            docker_inventory_ready.set()
+            logger.warning(f"Docker inventory stream failed, reconnecting in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+def seed_docker_inventory(client):
+    """Replace the inventory with a full listing from the daemon"""
+    containers = {item['Id']: container_inventory_entry(item['State'], item.get('Labels'))
+                  for item in client.api.containers(all=True)}
+    images = {item['Id']: image_inventory_entry(item) for item in client.api.images()}
+    docker_version = client.api.version().get('Version', 'Unknown')
+    
+    totals = {'containers': 0, 'running': 0, 'images': 0, 'dangling': 0, 'image_bytes': 0, 'dangling_bytes': 0,
+              'managed_containers': 0, 'managed_images': 0, 'managed_image_bytes': 0}
+    for container in containers.values():
+        count_container(totals, container, 1)
+    for image in images.values():
+        count_image(totals, image, 1)
+    
+    with docker_inventory_lock:
+        docker_inventory.update(containers=containers, images=images, totals=totals, docker_version=docker_version,
+                                synced_at=time.time(), connected=True, error=None)
+    docker_inventory_ready.set()
+    logger.info(f"Docker inventory synced: {totals['containers']} containers, {totals['images']} images")
+
+def container_inventory_entry(state, labels):
+    """State of a container and whether Hub Helper created it"""
+    return {'state': state, 'managed': (labels or {}).get(DOCKER_MANAGED_LABEL) == 'true'}
+
+def image_inventory_entry(image):
+    """Size, dangling flag and ownership of an image from a list or inspect response"""
+    tags = [tag for tag in image.get('RepoTags') or [] if tag != '<none>:<none>']
+    labels = image.get('Labels') or (image.get('Config') or {}).get('Labels') or {}
+    return {'size': image.get('Size') or 0, 'dangling': not tags,
+            'managed': labels.get(DOCKER_MANAGED_LABEL) == 'true'}
+
+def count_container(totals, container, sign):
+    """Add (sign=1) or remove (sign=-1) a container from the running totals"""
+    totals['containers'] += sign
+    if container['state'] == 'running':
+        totals['running'] += sign
+    if container['managed']:
+        totals['managed_containers'] += sign
+
+def count_image(totals, image, sign):
+    """Add (sign=1) or remove (sign=-1) an image from the running totals"""
+    totals['images'] += sign
+    totals['image_bytes'] += sign * image['size']
+    if image['dangling']:
+        totals['dangling'] += sign
+        totals['dangling_bytes'] += sign * image['size']
+    if image['managed']:
+        totals['managed_images'] += sign
+        totals['managed_image_bytes'] += sign * image['size']
+
+def apply_docker_event(client, event):
+    """Update the inventory from one container or image event"""
+    action = (event.get('Action') or event.get('status') or '').split(':')[0]
+    object_id = (event.get('Actor') or {}).get('ID') or event.get('id')
+    
+    if action == 'prune':
+        # Prunes also report each removed object, but a resync is simpler and exact
+        seed_docker_inventory(client)
+        return
+    
+    if event.get('Type') == 'container':
+        state = DOCKER_CONTAINER_EVENT_STATES.get(action)
+        if action != 'destroy' and state is None:
+            return
+        with docker_inventory_lock:
+            containers, totals = docker_inventory['containers'], docker_inventory['totals']
+            previous = containers.pop(object_id, None)
+            if previous:
+                count_container(totals, previous, -1)
+            if state:
+                # Container events carry the container's labels as actor attributes
+                container = container_inventory_entry(state, (event.get('Actor') or {}).get('Attributes'))
+                if previous:
+                    container['managed'] = previous['managed']
+                containers[object_id] = container
+                count_container(totals, container, 1)
+            docker_inventory['events'] += 1
+    
+    elif event.get('Type') == 'image':
+        # Pull and tag events name the image by reference, so look up its ID and current tags
+        image_id, image = object_id, None
+        if action != 'delete':
+            try:
+                details = client.api.inspect_image(object_id)
+                image_id, image = details['Id'], image_inventory_entry(details)
+            except docker.errors.NotFound:
+                pass
+        with docker_inventory_lock:
+            images, totals = docker_inventory['images'], docker_inventory['totals']
+            if image_id in images:
+                count_image(totals, images.pop(image_id), -1)
+            if image:
+                images[image_id] = image
+                count_image(totals, image, 1)
+            docker_inventory['events'] += 1
+
+def get_docker_inventory():
+    """Current container and image totals, seeding the inventory on first use"""
+    start_docker_inventory()
+    docker_inventory_ready.wait(timeout=10)
+    with docker_inventory_lock:
+        if docker_inventory['synced_at'] is None:
+            raise RuntimeError(docker_inventory['error'] or 'Docker inventory is not available yet')
+        return {
+            'totals': dict(docker_inventory['totals']),
+            'docker_version': docker_inventory['docker_version'],
+            'synced_at': docker_inventory['synced_at'],
+            'events': docker_inventory['events'],
+            'connected': docker_inventory['connected'],
+            'error': docker_inventory['error']
+        }
+
 @app.route('/system/status')
 def system_status():
     """Get system status including Docker resource usage"""
     try:
-        client = docker.from_env()
-        
-        # Get container counts
-        running_containers = len(client.containers.list())
-        all_containers = len(client.containers.list(all=True))
-        stopped_containers = all_containers - running_containers
-        
-        # Get image counts
-        all_images = len(client.images.list())
-        dangling_images = len(client.images.list(filters={'dangling': True}))
-        
-        # Get basic system info
-        system_info = client.info()
-        
-        client.close()
+        inventory = get_docker_inventory()
+        totals = inventory['totals']
+        stopped_containers = totals['containers'] - totals['running']
         
         return jsonify({
             'containers': {
-                'running': running_containers,
+                'running': totals['running'],
                 'stopped': stopped_containers,
-                'total': all_containers
+                'total': totals['containers']
             },
             'images': {
-                'total': all_images,
-                'dangling': dangling_images
+                'total': totals['images'],
+                'dangling': totals['dangling'],
+                'size': totals['image_bytes'],
+                'dangling_size': totals['dangling_bytes']
+            },
+            'docker_version': inventory['docker_version'],
+            'cleanup_recommended': stopped_containers > 5 or totals['dangling'] > 10,
+            # Artifacts labelled as built by Hub Helper
+            'hub_helper': {
+                'containers': totals['managed_containers'],
+                'images': totals['managed_images'],
+                'image_size': totals['managed_image_bytes']
             },
-            'docker_version': system_info.get('ServerVersion', 'Unknown'),
-            'cleanup_recommended': stopped_containers > 5 or dangling_images > 10
+            'inventory': {
+                'synced_at': datetime.fromtimestamp(inventory['synced_at']).isoformat(),
+                'events_applied': inventory['events'],
+                # While disconnected the totals are the last known state
+                'live': inventory['connected'],
+                'error': inventory['error']
+            }
         })
         
     except Exception as e:
+        reset_docker_client_if_disconnected(e)
         logger.error(f"Failed to get system status: {e}")
         return jsonify({
             'error': str(e),
@@ -716,49 +4011,10 @@ def system_status():
 def cleanup_old_containers():
     """Automatically clean up old containers created during builds"""
     try:
-        client = docker.from_env()
-        removed_count = 0
-        
-        # Remove containers in 'created' state (often leftover from builds)
-        created_containers = client.containers.list(all=True, filters={'status': 'created'})
-        for container in created_containers:
-            try:
-                # Check if container is older than 10 minutes
-                from datetime import datetime, timezone
-                created_time = datetime.fromisoformat(container.attrs['Created'].replace('Z', '+00:00'))
-                current_time = datetime.now(timezone.utc)
-                if (current_time - created_time).total_seconds() > 600:  # 10 minutes
-                    container.remove(force=True)
-                    removed_count += 1
-                    logger.info(f"Auto-cleanup: Removed old created container {container.short_id}")
-            except Exception as e:
-                logger.warning(f"Failed to remove created container {container.short_id}: {e}")
-        
-        # Remove exited containers older than 30 minutes
-        exited_containers = client.containers.list(all=True, filters={'status': 'exited'})
-        for container in exited_containers:
-            try:
-                created_time = datetime.fromisoformat(container.attrs['Created'].replace('Z', '+00:00'))
-                current_time = datetime.now(timezone.utc)
-                if (current_time - created_time).total_seconds() > 1800:  # 30 minutes
-                    container.remove(force=True)
-                    removed_count += 1
-                    logger.info(f"Auto-cleanup: Removed old exited container {container.short_id}")
-            except Exception as e:
-                logger.warning(f"Failed to remove exited container {container.short_id}: {e}")
-        
-        # Clean up dangling images if we removed containers
-        if removed_count > 0:
-            try:
-                client.images.prune(filters={'dangling': True})
-                logger.info("Auto-cleanup: Pruned dangling images")
-            except Exception as e:
-                logger.warning(f"Failed to prune images during auto-cleanup: {e}")
-        
-        client.close()
-        logger.info(f"Auto-cleanup completed: {removed_count} containers removed")
-        
+        # Exited containers after 30 minutes, never-started ones after 10
+        run_docker_cleanup(get_docker_client(), container_age=1800, created_age=600, labels=[DOCKER_MANAGED_FILTER])
     except Exception as e:
+        reset_docker_client_if_disconnected(e)
         logger.error(f"Auto-cleanup failed: {e}")
 
 @app.route('/analytics/debug')
@@ -802,24 +4058,22 @@ def get_analytics_counters():
     client_ip = request.environ.get('HTTP_X_REAL_IP', request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr))
     logger.info(f"Analytics request from {client_ip}")
     
-    try:
-        # The working endpoint is /analytics/hub-helper
-        logger.debug(f"Attempting to fetch analytics from {ANALYTICS_API}/analytics/hub-helper")
-        response = requests.get(f'{ANALYTICS_API}/analytics/hub-helper', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            logger.info(f"Successfully fetched analytics from external API")
-            return jsonify({
-                'success': True,
-                'github_count': data.get('github_clicks', 0),
-                'dockerhub_count': data.get('dockerhub_clicks', 0),
-                'source': 'external_api',
-                'total_clicks': data.get('total_clicks', 0)
-            })
-        else:
-            logger.debug(f"External API returned {response.status_code}: {response.text}")
-    except Exception as e:
-        logger.warning(f"Failed to fetch analytics from external API: {e}")
+    # Shared, cached view of the external API; see get_analytics_upstream
+    upstream = get_analytics_upstream()
+    if upstream['status_code'] == 200 and isinstance(upstream['data'], dict):
+        data = upstream['data']
+        return jsonify({
+            'success': True,
+            'github_count': data.get('github_clicks', 0),
+            'dockerhub_count': data.get('dockerhub_clicks', 0),
+            'source': 'external_api',
+            'total_clicks': data.get('total_clicks', 0),
+            'cache_age': upstream['age']
+        })
+    elif upstream['error']:
+        logger.warning(f"Failed to fetch analytics from external API: {upstream['error']}")
+    else:
+        logger.debug(f"External API returned {upstream['status_code']}")
     
     # Fallback: use local analytics
     logger.info("Using local analytics counters as fallback")
@@ -841,15 +4095,27 @@ def get_analytics_counters():
             'source': 'default'
         }), 500
 
+@app.route('/analytics/breakdown')
+def get_analytics_breakdown():
+    """Local deployment counts per project and per day"""
+    try:
+        days = max(1, int(request.args.get('days', 30)))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'days must be an integer'}), 400
+    
+    try:
+        breakdown = get_local_analytics_breakdown(request.args.get('project'), days)
+        return jsonify({'success': True, **breakdown})
+    except Exception as e:
+        logger.error(f"Failed to get analytics breakdown: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/analytics/reset', methods=['POST'])
 def reset_analytics():
     """Reset analytics counters (local only)"""
     try:
-        # Reset local analytics file
-        analytics = {'github_count': 0, 'dockerhub_count': 0}
-        
-        with open(LOCAL_ANALYTICS_FILE, 'w') as f:
-            json.dump(analytics, f)
+        # Reset local analytics store
+        reset_local_analytics()
         
         logger.info("Analytics counters reset successfully")
         
@@ -866,6 +4132,44 @@ def reset_analytics():
             'error': str(e)
         }), 500
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    """Record request latency per route template (not per concrete URL)"""
+    if 'request_started' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_DURATION.labels(request.method, route, response.status_code).observe(
+            time.perf_counter() - g.pop('request_started'))
+    return response
+
+@app.teardown_request
+def observe_failed_request_latency(error):
+    """Requests that raised never reach after_request; record them as 500s"""
+    if error is not None and 'request_started' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_DURATION.labels(request.method, route, 500).observe(time.perf_counter() - g.pop('request_started'))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for all worker processes"""
+    # Queue depth and outbox backlog are shared state, so they are read at scrape time
+    counts = dict(get_deploy_jobs_db().execute(
+        "SELECT status, COUNT(*) FROM deploy_jobs WHERE status IN ('queued', 'running') GROUP BY status"
+    ).fetchall())
+    for status in ('queued', 'running'):
+        DEPLOY_JOBS.labels(status).set(counts.get(status, 0))
+    ANALYTICS_OUTBOX_PENDING.set(get_analytics_outbox_status()['pending'])
+    
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for diagnostics"""
@@ -878,25 +4182,25 @@ def health_check():
         'version': get_version_string(),
         'analytics': {
             'external_api': ANALYTICS_API,
-            'local_file_exists': os.path.exists(LOCAL_ANALYTICS_FILE)
+            'local_file_exists': os.path.exists(LOCAL_ANALYTICS_DB)
         }
     }
     
-    # Test external analytics API connectivity
-    try:
-        response = requests.get(f'{ANALYTICS_API}/analytics/hub-helper', timeout=3)
-        health_info['analytics']['external_api_status'] = response.status_code
+    # External analytics API connectivity, from the shared upstream cache
+    upstream = get_analytics_upstream()
+    if upstream['status_code'] is not None:
+        health_info['analytics']['external_api_status'] = upstream['status_code']
         health_info['analytics']['external_api_reachable'] = True
         # Include the external API data if available
-        if response.status_code == 200:
-            try:
-                external_data = response.json()
-                health_info['analytics']['external_api_data'] = external_data
-            except:
+        if upstream['status_code'] == 200:
+            if upstream['data'] is not None:
+                health_info['analytics']['external_api_data'] = upstream['data']
+            else:
                 health_info['analytics']['external_api_data'] = 'Unable to parse JSON response'
-    except Exception as e:
-        health_info['analytics']['external_api_status'] = f'Error: {str(e)}'
+    else:
+        health_info['analytics']['external_api_status'] = f"Error: {upstream['error']}"
         health_info['analytics']['external_api_reachable'] = False
+    health_info['analytics']['external_api_cache_age'] = upstream['age']
     
     # Check local analytics
     try:
@@ -905,8 +4209,20 @@ def health_check():
     except Exception as e:
         health_info['analytics']['local_error'] = str(e)
     
+    health_info['analytics']['outbox'] = get_analytics_outbox_status()
+    
+    health_info['caches'] = {
+        'credential_validation': get_validation_cache_stats(),
+        'analytics_upstream': get_analytics_upstream_stats()
+    }
+    
     return jsonify(health_info)
 
+# Deliver any events left in the outbox by a previous run and pick up
+# deploy jobs queued by other server processes
+start_analytics_dispatcher()
+start_deploy_dispatcher()
+
 if __name__ == '__main__':
     # Configure logging for production
     logging.basicConfig(
@@ -0,0 +1,77 @@
+"""
+Gunicorn configuration for running Hub Helper in production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Reload code and configuration gracefully with `kill -HUP <master pid>`;
+running deploys finish on the old workers before they exit (up to
+HUB_HELPER_GRACEFUL_TIMEOUT seconds).
+
+State shared between worker processes:
+- Sessions are signed cookies, so every worker only needs the same SECRET_KEY.
+- The deploy job queue, local analytics counters, the analytics outbox and the
+  cached analytics upstream response are stored in the data directory and
+  coordinated across processes.
+- Credential validation, project index and Docker client caches are per
+  process; they only cost one upstream refresh per worker.
+- Prometheus metrics are written by each worker to PROMETHEUS_MULTIPROC_DIR
+  and merged by /metrics.
+"""
+
+import glob
+import importlib.util
+import logging
+import os
+import tempfile
+
+bind = os.environ.get('HUB_HELPER_BIND', '0.0.0.0:5414')
+
+# Worker processes, and threads per process for the gthread worker class.
+# Long-lived SSE progress streams each hold a thread, so prefer threads over
+# processes unless gevent is used.
+workers = int(os.environ.get('HUB_HELPER_WORKERS', '2'))
+threads = int(os.environ.get('HUB_HELPER_THREADS', '16'))
+worker_class = os.environ.get('HUB_HELPER_WORKER_CLASS', 'gthread')
+worker_connections = int(os.environ.get('HUB_HELPER_WORKER_CONNECTIONS', '1000'))
+
+# gevent is optional; fall back to threads if it isn't installed
+if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+    logging.getLogger('gunicorn.error').warning(
+        "HUB_HELPER_WORKER_CLASS=gevent but gevent is not installed, using gthread")
+    worker_class = 'gthread'
+
+# Keep-alive and timeouts (seconds)
+keepalive = int(os.environ.get('HUB_HELPER_KEEPALIVE', '5'))
+timeout = int(os.environ.get('HUB_HELPER_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('HUB_HELPER_GRACEFUL_TIMEOUT', '600'))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('HUB_HELPER_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('HUB_HELPER_MAX_REQUESTS_JITTER', '0'))
+
+# Each worker must import the app itself so its background threads (deploy
+# dispatcher, analytics dispatcher, refreshers) run in that worker
+preload_app = False
+
+accesslog = os.environ.get('HUB_HELPER_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('HUB_HELPER_LOG_LEVEL', 'info')
+
+# Behind a reverse proxy, trust its X-Forwarded-* headers
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+# Per-worker Prometheus metric files; must be set before the workers import the app
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'hub-helper-metrics'))
+
+
+def on_starting(server):
+    # Samples left over from a previous run would otherwise be merged into this one
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)